@@ -1,8 +1,15 @@
 from . import sedes  # noqa: F401
 from .codec import (  # noqa: F401
     encode,
+    encode_into,
+    encode_many,
+    encoded_length,
     decode,
+    decode_many,
+    decode_sequence,
+    Decoder,
     infer_sedes,
+    validate,
 )
 from .exceptions import (  # noqa: F401
     RLPException,
@@ -11,5 +18,10 @@ from .exceptions import (  # noqa: F401
     SerializationError,
     DeserializationError,
 )
+from .index import RLPIndex  # noqa: F401
+from .interning import InternTable  # noqa: F401
+from .limits import DecodeLimits  # noqa: F401
 from .lazy import decode_lazy, peek, LazyList  # noqa: F401
+from .parallel import encode_parallel  # noqa: F401
 from .sedes import Serializable  # noqa: F401
+from .stream import encode_to_stream, iter_decode, iterencode, ListWriter  # noqa: F401
@@ -0,0 +1,81 @@
+"""
+Reading RLP encoded items from :mod:`asyncio` streams.
+"""
+import asyncio
+
+from rlp.codec import (
+    _header_length,
+    _item_length,
+    decode,
+)
+from rlp.exceptions import DecodingError
+from rlp.limits import Budget
+
+
+DEFAULT_MAX_SIZE = 16 * 1024 * 1024
+
+
+async def read_item(reader, sedes=None, max_size=DEFAULT_MAX_SIZE, limits=None, **kwargs):
+    r"""Read and decode a single RLP encoded item from a stream.
+
+    The header of the item is read first, then exactly as many bytes as it announces, so no data
+    following the item is consumed. Items larger than `max_size` are rejected based on their
+    header alone, before their payload is read.
+
+    :param reader: the :class:`asyncio.StreamReader` to read from
+    :param sedes: an object implementing a function ``deserialize(code)`` which will be applied
+                  to the item, or ``None`` if no deserialization should be performed
+    :param max_size: the maximum length of the encoded item in bytes, or ``None`` for no limit
+    :param limits: a :class:`rlp.DecodeLimits` object restricting the item, or ``None``. As
+                   `max_size`, the size limit and, for strings, the length limit are checked
+                   before the payload is read.
+    :param \*\*kwargs: additional keyword arguments that will be passed to :func:`rlp.decode`
+    :returns: the decoded and maybe deserialized item
+    :raises: :exc:`asyncio.IncompleteReadError` if the stream ends before the item starts
+    :raises: :exc:`rlp.DecodingError` if the item is invalid, too large, or the stream ends in the
+             middle of it
+    :raises: :exc:`rlp.DeserializationError` if the deserialization fails
+    """
+    first_byte = await reader.readexactly(1)
+    try:
+        header = first_byte + await reader.readexactly(_header_length(first_byte[0]) - 1)
+        length = _item_length(header)
+        if max_size is not None and length > max_size:
+            msg = 'Item of {} bytes exceeds the maximum size of {} bytes'.format(length, max_size)
+            raise DecodingError(msg, header)
+        if limits is not None:
+            Budget(limits).check_header(header, length)
+        payload = await reader.readexactly(length - len(header))
+    except asyncio.IncompleteReadError as e:
+        raise DecodingError('Stream ended in the middle of an item', first_byte + e.partial)
+    return decode(header + payload, sedes, limits=limits, **kwargs)
+
+
+class ItemReader(object):
+    """An asynchronous iterator over the RLP encoded items read from a stream.
+
+    Iteration stops when the stream ends between two items::
+
+        async for item in rlp.aio.ItemReader(reader, sedes):
+            ...
+
+    The arguments are the same as for :func:`rlp.aio.read_item`.
+    """
+
+    def __init__(self, reader, sedes=None, max_size=DEFAULT_MAX_SIZE, limits=None, **kwargs):
+        self.reader = reader
+        self.sedes = sedes
+        self.max_size = max_size
+        self.limits = limits
+        self.kwargs = kwargs
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await read_item(
+                self.reader, self.sedes, self.max_size, self.limits, **self.kwargs
+            )
+        except asyncio.IncompleteReadError:
+            raise StopAsyncIteration
@@ -8,3 +8,4 @@ class Atomic(metaclass=abc.ABCMeta):
 
 Atomic.register(bytes)
 Atomic.register(bytearray)
+Atomic.register(memoryview)
@@ -1,20 +1,49 @@
+from array import array
 import collections
+import copy
+import threading
 
 from eth_utils import (
     big_endian_to_int,
-    int_to_big_endian,
     is_bytes,
 )
 
-from rlp.atomic import (
-    Atomic,
+from rlp.exceptions import (
+    DecodingError,
+    DeserializationError,
+    EncodingError,
+    ListDeserializationError,
+    ObjectDeserializationError,
 )
-from rlp.exceptions import EncodingError, DecodingError
+from rlp.interning import intern_table
+from rlp.limits import Budget, DecodeLimits
 from rlp.sedes.binary import Binary as BinaryClass
-from rlp.sedes import big_endian_int, binary, boolean, text
-from rlp.sedes.lists import List, is_sedes, is_sequence
-from rlp.sedes.serializable import Serializable
-from rlp.utils import ALL_BYTES
+from rlp.sedes import (
+    BigEndianInt,
+    Boolean,
+    Text,
+    big_endian_int,
+    binary,
+    boolean,
+    text,
+)
+from rlp.sedes.lists import CountableList, List, is_sedes, is_sequence
+from rlp.sedes.serializable import (
+    BaseSerializable,
+    Serializable,
+    SerializableBase,
+    make_immutable,
+)
+from rlp.segments import (  # noqa: F401
+    LONG_LENGTH,
+    append_raw_segments,
+    append_serialized_segments,
+    length_prefix,
+    length_prefix_size,
+    raw_encoded_length,
+    serialized_encoded_length,
+    write_segments,
+)
 
 
 def encode(obj, sedes=None, infer_serializer=True, cache=True):
@@ -23,7 +52,9 @@ def encode(obj, sedes=None, infer_serializer=True, cache=True):
     By default, the object is serialized in a suitable way first (using
     :func:`rlp.infer_sedes`) and then encoded. Serialization can be explicitly
     suppressed by setting `infer_serializer` to ``False`` and not passing an
-    alternative as `sedes`.
+    alternative as `sedes`. Sedes objects providing a method ``encode_segments``
+    (as all sedes in :mod:`rlp.sedes` do) serialize and encode in a single pass,
+    without building the intermediate serialization.
 
     If `obj` has an attribute :attr:`_cached_rlp` (as, notably,
     :class:`rlp.Serializable`) and its value is not `None`, this value is
@@ -31,9 +62,20 @@ def encode(obj, sedes=None, infer_serializer=True, cache=True):
     the cache is assumed to refer to the standard serialization which can be
     replaced by specifying `sedes`).
 
+    The same applies to :class:`rlp.Serializable` objects nested inside `obj`:
+    if their class matches the sedes they are serialized with, their cached
+    encoding is reused verbatim.
+
     If `obj` is a :class:`rlp.Serializable` and `cache` is true, the result of
     the encoding will be stored in :attr:`_cached_rlp` if it is empty.
 
+    Serialization (including the inference of the sedes) recurses once per
+    level of nested lists, so objects nested more deeply than Python's
+    recursion limit allows raise :exc:`RecursionError`. Deeply nested
+    sequences of strings can be encoded with `infer_serializer` set to
+    ``False``, which traverses them iteratively, or with
+    :func:`rlp.codec.encode_raw`, which can also limit their depth.
+
     :param sedes: an object implementing a function ``serialize(obj)`` which will be used to
                   serialize ``obj`` before encoding, or ``None`` to use the infered one (if any)
     :param infer_serializer: if ``True`` an appropriate serializer will be selected using
@@ -57,58 +99,168 @@ def encode(obj, sedes=None, infer_serializer=True, cache=True):
     else:
         really_cache = False
 
-    if sedes:
-        item = sedes.serialize(obj)
-    elif infer_serializer:
-        item = infer_sedes(obj).serialize(obj)
-    else:
-        item = obj
-
-    result = encode_raw(item)
+    segments = []
+    _append_segments(obj, sedes, infer_serializer, segments)
+    result = b''.join(segments)
     if really_cache:
         obj._cached_rlp = result
     return result
 
 
-def encode_raw(item):
-    """RLP encode (a nested sequence of) :class:`Atomic`s."""
-    if isinstance(item, Atomic):
-        if len(item) == 1 and item[0] < 128:
-            return item
-        payload = item
-        prefix_offset = 128  # string
-    elif not isinstance(item, str) and isinstance(item, collections.Sequence):
-        payload = b''.join(encode_raw(x) for x in item)
-        prefix_offset = 192  # list
+def encode_many(objs, sedes=None, infer_serializer=True, cache=True, concatenate=False):
+    """Encode a batch of Python objects in RLP format.
+
+    This is equivalent to calling :func:`rlp.encode` with the same arguments on each element of
+    `objs`, but avoids repeating the per call overhead. If `sedes` is not given, the sedes of
+    consecutive :class:`rlp.Serializable` objects of the same class is only inferred once.
+
+    :param objs: an iterable of the objects to encode
+    :param concatenate: if true, the encodings are returned as a single byte string together with
+                        their offsets, instead of as a list of byte strings. In this case, no
+                        encodings are cached in :attr:`_cached_rlp`.
+    :returns: a list of the RLP encoded objects or, if `concatenate` is true, a tuple
+              ``(rlp, offsets)`` where ``rlp`` is the concatenation of all encodings and
+              ``offsets`` is an :class:`array.array` containing the position at which each
+              encoding starts followed by the length of ``rlp``
+    :raises: :exc:`rlp.EncodingError` if one of the objects can't be encoded
+    :raises: :exc:`rlp.SerializationError` if the serialization of one of the objects fails
+    """
+    encodings = []
+    segments = []
+    offsets = array('Q', [0])
+    inferred_class = None
+
+    for obj in objs:
+        if sedes:
+            obj_sedes = sedes
+        elif not infer_serializer:
+            obj_sedes = None
+        elif obj.__class__ is inferred_class:
+            obj_sedes = inferred_class
+        else:
+            obj_sedes = _infer_encoding_sedes(obj)
+            if obj_sedes is obj.__class__:
+                inferred_class = obj_sedes
+
+        if sedes is None and isinstance(obj, Serializable):
+            cached_rlp = obj._cached_rlp_view()
+        else:
+            cached_rlp = None
+        if cached_rlp:
+            segments.append(cached_rlp)
+            length = len(cached_rlp)
+        elif obj_sedes is None:
+            length = append_raw_segments(obj, segments)
+        else:
+            length = append_serialized_segments(obj, obj_sedes, segments)
+
+        if concatenate:
+            offsets.append(offsets[-1] + length)
+        else:
+            result = b''.join(segments)
+            del segments[:]
+            if cache and sedes is None and cached_rlp is None and isinstance(obj, Serializable):
+                obj._cached_rlp = result
+            encodings.append(result)
+
+    if concatenate:
+        return b''.join(segments), offsets
     else:
-        msg = 'Cannot encode object of type {0}'.format(type(item).__name__)
-        raise EncodingError(msg, item)
+        return encodings
 
-    try:
-        prefix = length_prefix(len(payload), prefix_offset)
-    except ValueError:
-        raise EncodingError('Item too big to encode', item)
 
-    return prefix + payload
+def encode_into(obj, buffer, offset=0, sedes=None, infer_serializer=True):
+    """Encode a Python object in RLP format directly into a writable buffer.
+
+    Serialization works as in :func:`rlp.encode`, including the use of :attr:`_cached_rlp`, but
+    instead of returning a new byte string the encoding is written to `buffer`, starting at
+    `offset`. Nothing is written if the buffer turns out to be too small.
+
+    :param buffer: a writable object supporting the buffer protocol, e.g. a :class:`bytearray`,
+                   a :class:`memoryview` or an :class:`mmap.mmap`
+    :param offset: the position in `buffer` at which the encoding starts
+    :param sedes: an object implementing a function ``serialize(obj)`` which will be used to
+                  serialize ``obj`` before encoding, or ``None`` to use the infered one (if any)
+    :param infer_serializer: if ``True`` an appropriate serializer will be selected using
+                             :func:`rlp.infer_sedes` to serialize `obj` before encoding
+    :returns: the number of bytes written
+    :raises: :exc:`rlp.EncodingError` if the encoding does not fit into `buffer`
+    :raises: :exc:`rlp.SerializationError` if the serialization fails
+    :raises: :exc:`TypeError` if `buffer` is not a writable buffer
+    """
+    # the views are released on every path, as tracebacks of failed calls would otherwise keep
+    # the buffer exported (an mmap.mmap can't be closed while this is the case)
+    with memoryview(buffer) as raw, raw.cast('B') as view:
+        if view.readonly:
+            raise TypeError('Cannot encode into read-only buffer')
+        if offset < 0:
+            raise ValueError('Offset must not be negative')
+
+        segments = []
+        if isinstance(obj, Serializable) and sedes is None and obj._cached_rlp_length():
+            segments.append(obj._cached_rlp_view())
+            length = obj._cached_rlp_length()
+        else:
+            length = _append_segments(obj, sedes, infer_serializer, segments)
 
+        if offset + length > len(view):
+            msg = ('Buffer too small: encoding needs {} bytes at offset {}, but only {} are '
+                   'available')
+            raise EncodingError(msg.format(length, offset, max(0, len(view) - offset)), obj)
+        write_segments(segments, view, offset)
+        return length
 
-LONG_LENGTH = 256**8
 
+def encoded_length(obj, sedes=None, infer_serializer=True):
+    """Compute the length of the RLP encoding of a Python object without encoding it.
 
-def length_prefix(length, offset):
-    """Construct the prefix to lists or strings denoting their length.
+    Serialization works as in :func:`rlp.encode`, and the result always equals
+    ``len(rlp.encode(obj, sedes, infer_serializer))``. Cached encodings in :attr:`_cached_rlp`
+    of `obj` (if `sedes` is not given) or of nested :class:`rlp.Serializable` objects are not
+    re-encoded, only their lengths are used. As for :func:`rlp.encode`, the depth of nested
+    lists is limited by Python's recursion limit, unless `infer_serializer` is ``False``.
 
-    :param length: the length of the item in bytes
-    :param offset: ``0x80`` when encoding raw bytes, ``0xc0`` when encoding a
-                   list
+    :param sedes: an object implementing a function ``serialize(obj)`` which will be used to
+                  serialize ``obj`` before encoding, or ``None`` to use the infered one (if any)
+    :param infer_serializer: if ``True`` an appropriate serializer will be selected using
+                             :func:`rlp.infer_sedes` to serialize `obj` before encoding
+    :returns: the length of the encoding in bytes
+    :raises: :exc:`rlp.EncodingError` if the object can't be encoded
+    :raises: :exc:`rlp.SerializationError` if the serialization fails
     """
-    if length < 56:
-        return ALL_BYTES[offset + length]
-    elif length < LONG_LENGTH:
-        length_string = int_to_big_endian(length)
-        return ALL_BYTES[offset + 56 - 1 + len(length_string)] + length_string
+    if isinstance(obj, Serializable) and sedes is None and obj._cached_rlp_length():
+        return obj._cached_rlp_length()
+    elif sedes:
+        return serialized_encoded_length(obj, sedes)
+    elif infer_serializer:
+        return serialized_encoded_length(obj, _infer_encoding_sedes(obj))
     else:
-        raise ValueError('Length greater than 256**8')
+        return raw_encoded_length(obj)
+
+
+def _append_segments(obj, sedes, infer_serializer, segments):
+    if sedes:
+        return append_serialized_segments(obj, sedes, segments)
+    elif infer_serializer:
+        return append_serialized_segments(obj, _infer_encoding_sedes(obj), segments)
+    else:
+        return append_raw_segments(obj, segments)
+
+
+def encode_raw(item, max_depth=None):
+    """RLP encode (a nested sequence of) :class:`Atomic`s.
+
+    The item is traversed only once: every length prefix is computed and collected together with
+    references to the payloads in a flat list of segments (see :mod:`rlp.segments`), which are
+    then copied into a single result of exactly the right size.
+
+    :param max_depth: the maximum number of nested sequences, or ``None`` for no limit
+    :raises: :exc:`rlp.EncodingError` if `item` contains objects that can't be encoded or is
+             nested deeper than `max_depth`
+    """
+    segments = []
+    append_raw_segments(item, segments, max_depth)
+    return b''.join(segments)
 
 
 SHORT_STRING = 128 + 56
@@ -139,7 +291,7 @@ def consume_length_prefix(rlp, start):
         l = big_endian_to_int(len_prefix)  # noqa: E741
         if l < 56:
             raise DecodingError('Long string prefix used for short string', rlp)
-        return (rlp[start:start + 1] + len_prefix, bytes, l, start + 1 + ll)
+        return (rlp[start:start + 1 + ll], bytes, l, start + 1 + ll)
     elif b0 < 192 + 56:  # short list
         return (rlp[start:start + 1], list, b0 - 192, start + 1)
     else:  # long list
@@ -150,7 +302,40 @@ def consume_length_prefix(rlp, start):
         l = big_endian_to_int(len_prefix)  # noqa: E741
         if l < 56:
             raise DecodingError('Long list prefix used for short list', rlp)
-        return (rlp[start:start + 1] + len_prefix, list, l, start + 1 + ll)
+        return (rlp[start:start + 1 + ll], list, l, start + 1 + ll)
+
+
+def _header_length(first_byte):
+    """Get the length of the header of an encoded item from its first byte.
+
+    The header is the length prefix of the item, or the item itself if it is a single byte
+    encoded without a prefix.
+    """
+    if first_byte < SHORT_STRING or 192 <= first_byte < 192 + 56:
+        return 1
+    elif first_byte < 192:
+        return 1 + first_byte - 183
+    else:
+        return 1 + first_byte - 247
+
+
+def _item_length(header):
+    """Get the total length of an encoded item from its header (see :func:`_header_length`).
+
+    The header is only checked as far as needed to compute the length, the item has to be
+    decoded for full validation.
+    """
+    b0 = header[0]
+    if b0 < 128:
+        return 1
+    elif b0 < SHORT_STRING:
+        return 1 + b0 - 128
+    elif 192 <= b0 < 192 + 56:
+        return 1 + b0 - 192
+    elif header[1:2] == b'\x00':
+        raise DecodingError('Length starts with zero bytes', header)
+    else:
+        return len(header) + big_endian_to_int(header[1:])
 
 
 def consume_payload(rlp, prefix, start, type_, length):
@@ -206,7 +391,8 @@ def consume_item(rlp, start):
     return consume_payload(rlp, p, s, t, l)
 
 
-def decode(rlp, sedes=None, strict=True, recursive_cache=False, **kwargs):
+def decode(rlp, sedes=None, strict=True, recursive_cache=False, zero_copy=False, max_depth=None,
+           limits=None, intern=None, **kwargs):
     """Decode an RLP encoded object.
 
     If the deserialized result `obj` has an attribute :attr:`_cached_rlp` (e.g. if `sedes` is a
@@ -219,43 +405,785 @@ def decode(rlp, sedes=None, strict=True, recursive_cache=False, **kwargs):
                   after decoding, or ``None`` if no deserialization should be performed
     :param \*\*kwargs: additional keyword arguments that will be passed to the deserializer
     :param strict: if false inputs that are longer than necessary don't cause an exception
+    :param zero_copy: if true, `rlp` can be any object supporting the buffer protocol (e.g. a
+                      :class:`memoryview`, :class:`bytearray` or :class:`mmap.mmap`), and strings
+                      are returned as :class:`memoryview` slices of it instead of copies. The
+                      views keep the underlying buffer alive (an :class:`mmap.mmap` can't be
+                      closed while they exist) and reflect any later changes to its contents.
+                      Views of writable buffers are read-only, except on Python versions before
+                      3.8, on which they (and objects containing them) can't be hashed. Buffers
+                      of objects that can't be hashed, such as :class:`bytearray`, are copied
+                      once, so that the views can be hashed. The RLP caches of deserialized
+                      :class:`rlp.Serializable` objects refer to the buffer as well, and are left
+                      empty if the views are writable or the objects aren't serializables.
+    :param max_depth: the maximum number of nested lists (e.g. 1 for a list of strings), or
+                      ``None`` for no limit. Decoding fails as soon as this depth is exceeded.
+    :param limits: a :class:`rlp.DecodeLimits` object restricting the decoded object, or ``None``
+    :param intern: an :class:`rlp.InternTable` used to deduplicate repeated strings and nested
+                   :class:`rlp.Serializable` objects, ``True`` to deduplicate them within the
+                   decoded object only, or ``None``. As deduplicated values are shared, only
+                   immutable ones are interned: :class:`bytearray` input is converted to
+                   :class:`bytes` first, and lists are never shared. Can't be combined with
+                   `zero_copy`.
     :returns: the decoded and maybe deserialized Python object
     :raises: :exc:`rlp.DecodingError` if the input string does not end after the root item and
-             `strict` is true
+             `strict` is true, or if lists are nested deeper than `max_depth` or one of the
+             `limits` is exceeded
     :raises: :exc:`rlp.DeserializationError` if the deserialization fails
     """
+    rlp = _decodable(rlp, zero_copy)
+    intern = _decoding_intern_table(intern, zero_copy)
+    if intern is not None and not isinstance(rlp, bytes):
+        rlp = bytes(rlp)
+    if sedes and not kwargs:
+        return _consume_root_deserialized(
+            rlp, 0, len(rlp), strict, sedes, recursive_cache, intern,
+            _deserializing_limits(max_depth, limits),
+        )[0]
+    item, end, offsets = _consume_root_item(
+        rlp, 0, len(rlp), strict, recursive_cache, max_depth, limits=limits, intern=intern,
+    )
+    if sedes:
+        return _deserialize_root_item(rlp, 0, end, item, offsets, sedes, kwargs)
+    else:
+        return item
+
+
+def decode_many(blobs, sedes=None, strict=True, recursive_cache=False, offsets=None,
+                zero_copy=False, max_depth=None, limits=None, intern=None, **kwargs):
+    """Decode a batch of RLP encoded objects.
+
+    This is equivalent to calling :func:`rlp.decode` with the same arguments on each element of
+    `blobs`. Without a sedes, the arguments are checked once and the stack of unfinished lists is
+    shared by all objects, which saves some time for batches of small objects. With a sedes, the
+    objects are deserialized one by one as by :func:`rlp.decode`, so this is merely a
+    convenience.
+
+    :param blobs: an iterable of RLP strings, or, if `offsets` is given, a single RLP string
+                  containing the encodings of all objects back to back
+    :param offsets: ``None`` or, for a single RLP string, the positions at which the encoded
+                    objects start, followed by the position at which the last one ends (as
+                    returned by :func:`rlp.encode_many` with ``concatenate=True``)
+    :param zero_copy: if true, strings are returned as :class:`memoryview` slices of the input
+                      buffers, as described for :func:`rlp.decode`
+    :param max_depth: the maximum number of nested lists, as described for :func:`rlp.decode`
+    :param limits: a :class:`rlp.DecodeLimits` object restricting each decoded object, or
+                   ``None``
+    :param intern: an :class:`rlp.InternTable`, or ``True`` to deduplicate values across the
+                   batch, as described for :func:`rlp.decode`
+    :returns: a list of the decoded and maybe deserialized Python objects
+    :raises: :exc:`rlp.DecodingError` if one of the objects can't be decoded
+    :raises: :exc:`rlp.DeserializationError` if the deserialization of one of the objects fails
+    """
+    intern = _decoding_intern_table(intern, zero_copy)
+    if offsets is None:
+        positions = (
+            (rlp, 0, len(rlp))
+            for rlp in (_decodable(blob, zero_copy) for blob in blobs)
+        )
+    else:
+        rlp = _decodable(blobs, zero_copy)
+        positions = (
+            (rlp, offsets[index], offsets[index + 1])
+            for index in range(len(offsets) - 1)
+        )
+
+    fused = sedes and not kwargs
+    fused_limits = _deserializing_limits(max_depth, limits)
+    results = []
+    stack = []
+    for rlp, start, end in positions:
+        if intern is not None and not isinstance(rlp, bytes):
+            rlp = bytes(rlp)
+        if fused:
+            obj, _ = _consume_root_deserialized(
+                rlp, start, end, strict, sedes, recursive_cache, intern, fused_limits,
+            )
+            results.append(obj)
+            continue
+        item, item_end, item_offsets = _consume_root_item(
+            rlp, start, end, strict, recursive_cache, max_depth, stack, limits, intern,
+        )
+        if sedes:
+            results.append(
+                _deserialize_root_item(rlp, start, item_end, item, item_offsets, sedes, kwargs)
+            )
+        else:
+            results.append(item)
+    return results
+
+
+def decode_sequence(rlp, sedes=None, recursive_cache=False, zero_copy=False, max_depth=None,
+                    limits=None, return_offsets=False, **kwargs):
+    """Decode an RLP string containing any number of encoded objects back to back.
+
+    :param sedes: an object implementing a function ``deserialize(code)`` which will be applied
+                  to each decoded object, or ``None`` if no deserialization should be performed
+    :param return_offsets: if true, the positions of the encoded objects are returned as well
+    :returns: a list of the decoded and maybe deserialized Python objects, or, if
+              `return_offsets` is true, a tuple of the list and an :class:`array.array` of the
+              positions at which the encoded objects start followed by the position at which the
+              last one ends. The offsets can be passed on to :func:`rlp.decode_many`.
+    :raises: :exc:`rlp.DecodingError` if one of the objects can't be decoded or the last one is
+             truncated
+    :raises: :exc:`rlp.DeserializationError` if the deserialization of one of the objects fails
+
+    The remaining arguments are the same as for :func:`rlp.decode`, with `limits` applying to
+    each object separately.
+    """
+    rlp = _decodable(rlp, zero_copy)
+    fused = sedes and not kwargs
+    fused_limits = _deserializing_limits(max_depth, limits)
+    results = []
+    offsets = array('Q', [0])
+    stack = []
+    start = 0
+    end = len(rlp)
+    while start < end:
+        if fused:
+            obj, item_end = _consume_root_deserialized(
+                rlp, start, end, False, sedes, recursive_cache, limits=fused_limits,
+            )
+            results.append(obj)
+        else:
+            item, item_end, item_offsets = _consume_root_item(
+                rlp, start, end, False, recursive_cache, max_depth, stack, limits,
+            )
+            if sedes:
+                results.append(
+                    _deserialize_root_item(rlp, start, item_end, item, item_offsets, sedes, kwargs)
+                )
+            else:
+                results.append(item)
+        offsets.append(item_end)
+        start = item_end
+
+    if return_offsets:
+        return results, offsets
+    else:
+        return results
+
+
+def validate(rlp, strict=True, sequence=False, raise_on_error=False):
+    """Check if a buffer contains a valid RLP encoding.
+
+    The same rules as for :func:`rlp.decode` apply, including the rejection of non-canonical
+    encodings (length prefixes with leading zeros, long prefixes for short payloads and single
+    bytes below ``0x80`` encoded as strings). No items are constructed and no parts of the buffer
+    are copied, so invalid inputs can be rejected at a fraction of the cost of decoding them.
+
+    :param rlp: the bytes or other object supporting the buffer protocol to check
+    :param strict: if false, bytes after the root item are ignored
+    :param sequence: if true, the buffer may contain any number of items back to back (as decoded
+                     by :func:`rlp.decode_sequence`) instead of a single one
+    :param raise_on_error: if true, an exception is raised for invalid input instead of returning
+                           ``False``
+    :returns: ``True`` if the encoding is valid, ``False`` otherwise
+    :raises: :exc:`rlp.DecodingError` if the encoding is invalid and `raise_on_error` is true.
+             The message contains the position at which the problem has been found.
+    """
+    try:
+        _validate(rlp, strict, sequence)
+    except DecodingError:
+        if raise_on_error:
+            raise
+        return False
+    return True
+
+
+def _validate(rlp, strict, sequence):
     if not is_bytes(rlp):
+        try:
+            rlp = memoryview(rlp).cast('B')
+        except TypeError:
+            raise DecodingError('Can only validate buffers, got type %s' % type(rlp).__name__, rlp)
+
+    length = len(rlp)
+    # the payload ends of the unfinished lists
+    ends = []
+    position = 0
+    while True:
+        if ends:
+            if position == ends[-1]:
+                ends.pop()
+                continue
+            elif position > ends[-1]:
+                msg = 'List length prefix announced a too small length (list ends at offset {})'
+                raise DecodingError(msg.format(ends[-1]), rlp)
+        elif sequence:
+            if position == length:
+                return
+        elif position > 0:
+            break
+
+        if position >= length:
+            raise DecodingError('RLP string too short (item expected at offset {})'.format(
+                position), rlp)
+        b0 = rlp[position]
+        if b0 < 128:  # single byte
+            position += 1
+            continue
+        elif b0 < SHORT_STRING or 192 <= b0 < 192 + 56:  # short string or list
+            payload_start = position + 1
+            payload_length = b0 - 128 if b0 < SHORT_STRING else b0 - 192
+            if b0 == 129 and payload_start < length and rlp[payload_start] < 128:
+                msg = 'Encoded as short string although single byte was possible (at offset {})'
+                raise DecodingError(msg.format(position), rlp)
+        else:  # long string or list
+            payload_start = position + 1 + (b0 - 183 if b0 < 192 else b0 - 247)
+            if payload_start > length:
+                msg = 'RLP string too short (length prefix at offset {})'.format(position)
+                raise DecodingError(msg, rlp)
+            if rlp[position + 1] == 0:
+                msg = 'Length starts with zero bytes (at offset {})'.format(position)
+                raise DecodingError(msg, rlp)
+            payload_length = 0
+            for index in range(position + 1, payload_start):
+                payload_length = payload_length << 8 | rlp[index]
+            if payload_length < 56:
+                kind = 'string' if b0 < 192 else 'list'
+                msg = 'Long {0} prefix used for short {0} (at offset {1})'.format(kind, position)
+                raise DecodingError(msg, rlp)
+
+        payload_end = payload_start + payload_length
+        if payload_end > length:
+            msg = 'RLP string too short (item at offset {} ends at offset {})'.format(
+                position, payload_end)
+            raise DecodingError(msg, rlp)
+        if b0 < 192:
+            position = payload_end
+        else:
+            ends.append(payload_end)
+            position = payload_start
+
+    if strict and position != length:
+        msg = 'RLP string ends with {} superfluous bytes (at offset {})'.format(
+            length - position, position)
+        raise DecodingError(msg, rlp)
+
+
+class Decoder(object):
+    """A reusable RLP decoder.
+
+    Nested lists are decoded with an explicit stack instead of recursion, so that deeply nested
+    inputs neither hit Python's recursion limit nor pay for a function call per level. A decoder
+    allocates this stack once and reuses it for all calls, which makes it suitable for decoding
+    many messages in a row. As the stack is shared, a decoder must not be used by multiple threads
+    at the same time.
+
+    :param max_depth: the maximum number of nested lists in decoded items, or ``None`` for no
+                      limit
+    :param limits: a :class:`rlp.DecodeLimits` object restricting decoded objects, or ``None``
+    """
+
+    def __init__(self, max_depth=None, limits=None):
+        self.max_depth = max_depth
+        self.limits = limits
+        self._stack = []
+
+    def decode(self, rlp, sedes=None, strict=True, recursive_cache=False, zero_copy=False,
+               **kwargs):
+        """Decode an RLP encoded object.
+
+        This accepts the same arguments as :func:`rlp.decode`, except for `max_depth` and
+        `limits`.
+        """
+        rlp = _decodable(rlp, zero_copy)
+        if sedes and not kwargs:
+            return _consume_root_deserialized(
+                rlp, 0, len(rlp), strict, sedes, recursive_cache,
+                limits=_deserializing_limits(self.max_depth, self.limits),
+            )[0]
+        try:
+            item, end, offsets = _consume_root_item(
+                rlp, 0, len(rlp), strict, recursive_cache, self.max_depth, self._stack,
+                self.limits,
+            )
+        finally:
+            # a failed decoding leaves unfinished lists behind
+            del self._stack[:]
+        if sedes:
+            return _deserialize_root_item(rlp, 0, end, item, offsets, sedes, kwargs)
+        else:
+            return item
+
+
+def _decodable(rlp, zero_copy):
+    """Check that `rlp` can be decoded, wrapping it in a :class:`memoryview` in zero copy mode."""
+    if zero_copy:
+        try:
+            view = memoryview(rlp).cast('B')
+        except TypeError:
+            msg = 'Can only decode buffers in zero copy mode, got type %s' % type(rlp).__name__
+            raise DecodingError(msg, rlp)
+        # Views can only be hashed (which deserialized objects may rely on) if they are read-only
+        # and the object exporting the buffer can be hashed as well
+        if type(view.obj).__hash__ is None:
+            view = memoryview(bytes(view))
+        elif not view.readonly and hasattr(view, 'toreadonly'):
+            view = view.toreadonly()
+        return view
+    elif not is_bytes(rlp):
         raise DecodingError('Can only decode RLP bytes, got type %s' % type(rlp).__name__, rlp)
+    return rlp
+
+
+def _consume_root_item(rlp, start, end, strict, with_offsets, max_depth=None, stack=None,
+                       limits=None, intern=None):
+    """Read the item starting at `start` that is expected to end at `end`.
+
+    :returns: a tuple ``(item, item_end, offsets)`` as described in :func:`_consume_item`
+    """
+    budget = None if limits is None else Budget(limits)
     try:
-        item, per_item_rlp, end = consume_item(rlp, 0)
+        item, offsets, item_end = _consume_item(
+            rlp, start, with_offsets, max_depth, stack, budget, intern,
+        )
     except IndexError:
         raise DecodingError('RLP string too short', rlp)
-    if end != len(rlp) and strict:
-        msg = 'RLP string ends with {} superfluous bytes'.format(len(rlp) - end)
+    if item_end > end:
+        raise DecodingError('RLP string too short', rlp)
+    elif item_end != end and strict:
+        msg = 'RLP string ends with {} superfluous bytes'.format(end - item_end)
         raise DecodingError(msg, rlp)
-    if sedes:
-        obj = sedes.deserialize(item, **kwargs)
-        if is_sequence(obj) or hasattr(obj, '_cached_rlp'):
-            _apply_rlp_cache(obj, per_item_rlp, recursive_cache)
-        return obj
+    return item, item_end, offsets
+
+
+def _consume_item(rlp, start, with_offsets=False, max_depth=None, stack=None, budget=None,
+                  intern=None):
+    """Read an item from an RLP string, keeping track of nested lists on an explicit stack.
+
+    :param with_offsets: if true, the positions of all sub-items are collected
+    :param max_depth: the maximum number of nested lists, or ``None`` for no limit
+    :param stack: an empty list to use as the stack of unfinished lists, or ``None`` to use a
+                  new one
+    :param budget: a :class:`rlp.limits.Budget` that is checked for each item, or ``None``
+    :param intern: an :class:`rlp.InternTable` used to deduplicate strings, or ``None``
+    :returns: a tuple ``(item, offsets, end)`` where ``offsets`` is ``None`` if `with_offsets` is
+              false, or otherwise structured like the ``per_item_rlp`` returned by
+              :func:`consume_item`, but holding ``(start, end)`` tuples instead of the encodings
+    """
+    p, t, l, s = consume_length_prefix(rlp, start)
+    end = s + l
+    if budget is not None:
+        budget.check_size(end - start, rlp)
+        budget.add_item(t, l, rlp)
+        limit = budget.limits.max_depth
+        if limit is not None and (max_depth is None or limit < max_depth):
+            max_depth = limit
+    if t is bytes:
+        if end > len(rlp):
+            raise DecodingError('RLP string too short', rlp)
+        item = rlp[s:end] if intern is None else intern.intern(rlp[s:end])
+        return item, [(start, end)] if with_offsets else None, end
+    if max_depth is not None and max_depth < 1:
+        raise DecodingError('Maximum nesting depth of {} exceeded'.format(max_depth), rlp)
+
+    if stack is None:
+        stack = []
+    items = []
+    offsets = [(start, end)] if with_offsets else None
+    position = s
+    while True:
+        if position < end:
+            p, t, l, s = consume_length_prefix(rlp, position)
+            item_end = s + l
+            if budget is not None:
+                budget.check_list_length(len(items) + 1, rlp)
+                budget.add_item(t, l, rlp)
+            if t is bytes:
+                if item_end > len(rlp):
+                    raise DecodingError('RLP string too short', rlp)
+                if intern is None:
+                    items.append(rlp[s:item_end])
+                else:
+                    items.append(intern.intern(rlp[s:item_end]))
+                if with_offsets:
+                    offsets.append([(position, item_end)])
+                position = item_end
+            else:
+                if max_depth is not None and len(stack) + 1 >= max_depth:
+                    msg = 'Maximum nesting depth of {} exceeded'.format(max_depth)
+                    raise DecodingError(msg, rlp)
+                # descend into the nested list
+                stack.append((items, offsets, end))
+                items = []
+                if with_offsets:
+                    offsets = [(position, item_end)]
+                end = item_end
+                position = s
+        elif position > end:
+            raise DecodingError('List length prefix announced a too small length', rlp)
+        elif stack:
+            # the nested list is complete, continue with its parent
+            parent_items, parent_offsets, end = stack.pop()
+            parent_items.append(items)
+            items = parent_items
+            if with_offsets:
+                parent_offsets.append(offsets)
+                offsets = parent_offsets
+        else:
+            return items, offsets, end
+
+
+def _decoding_intern_table(intern, zero_copy):
+    """Get the :class:`rlp.InternTable` to use for the ``intern`` argument of a decoding call."""
+    table = intern_table(intern)
+    if table is not None and zero_copy:
+        raise ValueError('Strings decoded without copying can\'t be interned')
+    return table
+
+
+def _consume_root_deserialized(rlp, start, end, strict, sedes, recursive_cache, intern=None,
+                               limits=None):
+    """Read and deserialize the item starting at `start` that is expected to end at `end`.
+
+    This is the fast path of decoding with a sedes (see :func:`_consume_deserialized`). It raises
+    the same exceptions as decoding and deserializing in separate steps: as the latter only
+    deserializes completely decoded items, errors in the encoding take precedence. Therefore, if
+    the deserialization fails, the rest of the encoding is checked before the exception is passed
+    on. The same is done for errors in the encoding if `limits` are given, as some of them are
+    found before exceeded limits that decoding in a separate step reports first.
+
+    :param limits: a :class:`rlp.DecodeLimits` object restricting the item (see
+                   :func:`_deserializing_limits`), or ``None``
+    :returns: a tuple ``(obj, item_end)``
+    """
+    try:
+        if limits is None:
+            budget = None
+        else:
+            budget = Budget(limits)
+            # reject too large items before any work is done, as _consume_item does
+            _, _, l, s = consume_length_prefix(rlp, start)
+            budget.check_size(s + l - start, rlp)
+        obj, item_end = _consume_deserialized(rlp, start, sedes, recursive_cache, intern, budget)
+    except DecodingError:
+        if limits is not None:
+            _consume_root_item(rlp, start, end, strict, False, limits=limits)
+        raise
+    except Exception:
+        _consume_root_item(rlp, start, end, strict, False, limits=limits)
+        raise
+    if item_end > end:
+        raise DecodingError('RLP string too short', rlp)
+    elif item_end != end and strict:
+        msg = 'RLP string ends with {} superfluous bytes'.format(end - item_end)
+        raise DecodingError(msg, rlp)
+    if _has_rlp_cache(obj):
+        _cache_encoding(obj, rlp, start, item_end)
+    return obj, item_end
+
+
+# sedes types deserializing strings, which are applied to the payload directly
+_STRING_SEDES_TYPES = frozenset((BinaryClass, BigEndianInt, Boolean, Text))
+
+
+def _deserializing_limits(max_depth, limits):
+    """Combine the `max_depth` and `limits` arguments of a decoding call for the fast path.
+
+    :returns: a :class:`rlp.DecodeLimits` object, or ``None`` if neither argument restricts
+              decoding
+    """
+    if max_depth is None:
+        return limits
+    elif limits is None:
+        return DecodeLimits(max_depth=max_depth)
+    elif limits.max_depth is None or max_depth < limits.max_depth:
+        limits = copy.copy(limits)
+        limits.max_depth = max_depth
+    return limits
+
+
+def _consume_deserialized(rlp, start, sedes, recursive_cache, intern=None, budget=None, depth=1):
+    """Read an item and deserialize it in a single pass, without building the decoded item first.
+
+    Instances of the built-in sedes classes parse the elements of lists themselves, so that each
+    element is deserialized as soon as it has been read. :class:`rlp.Serializable` classes using
+    the default constructor are instantiated directly from the deserialized fields, skipping the
+    validation of arguments that can't fail in this case. All other sedes objects deserialize
+    the decoded item as usual.
+
+    :param recursive_cache: if true, the RLP caches of all nested objects are populated
+    :param intern: an :class:`rlp.InternTable` used to deduplicate strings deserialized by
+                   :class:`rlp.sedes.Binary` and the :class:`rlp.Serializable` objects nested
+                   in the item (see :func:`_consume_interned`), or ``None``
+    :param budget: a :class:`rlp.limits.Budget` that each item is counted against as in
+                   :func:`_consume_item`, or ``None``. Only the size of the root item has to be
+                   checked beforehand.
+    :param depth: the number of lists the item is nested in, including itself if it is a list
+    :returns: a tuple ``(obj, end)``
+    :raises: :exc:`rlp.DecodingError` if the item is not encoded correctly
+    :raises: :exc:`rlp.DeserializationError` if the deserialization fails. The same exception as
+             the one of the sedes is raised, but the encoding following the failing element
+             hasn't been checked yet.
+    """
+    sedes_type = type(sedes)
+    if sedes_type in _STRING_SEDES_TYPES:
+        p, t, l, s = consume_length_prefix(rlp, start)
+        end = s + l
+        if t is bytes:
+            if budget is not None:
+                budget.add_item(t, l, rlp)
+            if end > len(rlp):
+                raise DecodingError('RLP string too short', rlp)
+            if intern is not None and sedes_type is BinaryClass:
+                return sedes.deserialize(intern.intern(rlp[s:end])), end
+            return sedes.deserialize(rlp[s:end]), end
+        # lists are rejected by the sedes below
+    elif sedes_type is List or sedes_type is CountableList:
+        return _consume_deserialized_list(rlp, start, sedes, recursive_cache, intern, budget, depth)
+    elif isinstance(sedes, SerializableBase) and \
+            sedes.deserialize.__func__ is BaseSerializable.deserialize.__func__:
+        meta = sedes._meta
+        try:
+            values, end = _consume_deserialized_list(
+                rlp, start, meta.sedes, recursive_cache, intern, budget, depth,
+            )
+        except ListDeserializationError as e:
+            raise ObjectDeserializationError(serial=e.serial, sedes=sedes, list_exception=e)
+        if sedes.__init__ is BaseSerializable.__init__:
+            obj = sedes.__new__(sedes)
+            for value, attr in zip(values, meta.field_attrs):
+                setattr(obj, attr, make_immutable(value))
+        else:
+            obj = sedes(**dict(zip(meta.field_names, values)))
+        if recursive_cache:
+            _cache_encoding(obj, rlp, start, end)
+        return obj, end
+
+    item, offsets, end = _consume_budgeted_item(rlp, start, recursive_cache, intern, budget, depth)
+    obj = sedes.deserialize(item)
+    if recursive_cache and (is_sequence(obj) or _has_rlp_cache(obj)):
+        _apply_rlp_cache(obj, offsets, rlp)
+    return obj, end
+
+
+def _consume_deserialized_list(rlp, start, sedes, recursive_cache, intern, budget, depth):
+    """Read a list and deserialize it with a :class:`List` or :class:`CountableList` sedes.
+
+    :raises: :exc:`rlp.DecodingError` or :exc:`rlp.ListDeserializationError` as described in
+             :func:`_consume_deserialized`
+    """
+    p, t, l, s = consume_length_prefix(rlp, start)
+    end = s + l
+    if budget is not None:
+        budget.add_item(t, l, rlp)
+        if t is list:
+            budget.check_depth(depth, rlp)
+    if t is not list:
+        if end > len(rlp):
+            raise DecodingError('RLP string too short', rlp)
+        raise ListDeserializationError('Can only deserialize sequences', serial=rlp[s:end])
+
+    countable = type(sedes) is CountableList
+    # like List.deserialize, check the number of elements before deserializing any of them
+    # the headers of the elements of strict lists are checked while counting them
+    framed = not countable and sedes.strict
+    if framed and _count_elements(rlp, start, s, end) != len(sedes):
+        raise _list_deserialization_error(rlp, start, sedes)
+
+    consume = _consume_deserialized if intern is None else _consume_interned
+    values = []
+    position = s
+    count = 0
+    while position < end:
+        if not framed:
+            # elements must not extend beyond the list, so that no object is created from the
+            # bytes following it
+            _, _, l, element_start = consume_length_prefix(rlp, position)
+            if element_start + l > end:
+                _raise_list_decoding_error(rlp, start)
+        count += 1
+        if budget is not None:
+            budget.check_list_length(count, rlp)
+        index = len(values)
+        if countable:
+            if sedes.max_length is not None and index >= sedes.max_length:
+                raise ListDeserializationError(
+                    'Too many elements (more than {})'.format(sedes.max_length),
+                    serial=_consume_item(rlp, start)[0],
+                )
+            element_sedes = sedes.element_sedes
+        elif index < len(sedes):
+            element_sedes = sedes[index]
+        else:
+            # excess elements are ignored, but have to be valid
+            _, _, position = _consume_budgeted_item(
+                rlp, position, False, None, budget, depth + 1,
+            )
+            continue
+        try:
+            value, position = consume(
+                rlp, position, element_sedes, recursive_cache, intern, budget, depth + 1,
+            )
+        except DeserializationError as e:
+            raise _list_deserialization_error(rlp, start, sedes, e, index)
+        values.append(value)
+
+    if position != end:
+        raise DecodingError('List length prefix announced a too small length', rlp)
+    return tuple(values), end
+
+
+def _count_elements(rlp, start, payload_start, end):
+    """Count the elements of the list at `start` by skipping over their headers.
+
+    The elements themselves aren't checked, but they are guaranteed to end with the list.
+
+    :param payload_start: the position of the first element
+    :param end: the end of the list
+    """
+    count = 0
+    position = payload_start
+    try:
+        while position < end:
+            _, _, l, s = consume_length_prefix(rlp, position)
+            position = s + l
+            count += 1
+    except (DecodingError, IndexError):
+        # invalid headers may follow errors in the elements, which take precedence
+        position = None
+    if position != end:
+        _raise_list_decoding_error(rlp, start)
+    return count
+
+
+def _raise_list_decoding_error(rlp, start):
+    """Raise the exception decoding the invalid list at `start` in a separate step raises.
+
+    The list is decoded once more, so that errors are reported in the same order as by
+    :func:`_consume_item`.
+    """
+    _consume_item(rlp, start)
+    raise DecodingError('List length prefix announced a too small length', rlp)
+
+
+def _consume_interned(rlp, start, sedes, recursive_cache, intern, budget, depth):
+    """Read and deserialize an element of a list, sharing :class:`rlp.Serializable` objects.
+
+    Objects are interned by class and encoding, unless the encoding is longer than the maximum
+    length of the table. Roots aren't interned, so that each decoding call returns a new object.
+    Shared objects are still counted against the `budget`.
+    """
+    if not isinstance(sedes, SerializableBase) or \
+            sedes.deserialize.__func__ is not BaseSerializable.deserialize.__func__:
+        return _consume_deserialized(rlp, start, sedes, recursive_cache, intern, budget, depth)
+    p, t, l, s = consume_length_prefix(rlp, start)
+    end = s + l
+    if end > len(rlp):
+        raise DecodingError('RLP string too short', rlp)
+    if end - start > intern.max_length:
+        return _consume_deserialized(rlp, start, sedes, recursive_cache, intern, budget, depth)
+
+    key = (sedes, rlp[start:end])
+    obj = intern.get(key)
+    if obj is not None:
+        if budget is not None:
+            _consume_budgeted_item(rlp, start, False, None, budget, depth)
     else:
-        return item
+        obj, _ = _consume_deserialized(rlp, start, sedes, False, intern, budget, depth)
+        # the key holds a copy of the encoding anyway, which is also used as the cache, so that
+        # shared objects neither lack it nor keep the buffer alive
+        obj._cached_rlp = key[1]
+        intern.add(key, obj)
+    return obj, end
 
 
-def _apply_rlp_cache(obj, split_rlp, recursive):
-    item_rlp = split_rlp.pop(0)
-    if isinstance(obj, (int, bool, str, bytes, bytearray)):
-        return
-    elif hasattr(obj, '_cached_rlp'):
-        obj._cached_rlp = item_rlp
-    if not recursive:
-        return
-    for sub in obj:
-        if isinstance(sub, (int, bool, str, bytes, bytearray)):
-            split_rlp.pop(0)
+def _consume_budgeted_item(rlp, start, with_offsets, intern, budget, depth):
+    """Read an item nested at `depth` with :func:`_consume_item`, counting it against `budget`."""
+    max_depth = None
+    if budget is not None and budget.limits.max_depth is not None:
+        # _consume_item treats the item as a root
+        max_depth = budget.limits.max_depth - depth + 1
+    return _consume_item(rlp, start, with_offsets, max_depth, budget=budget, intern=intern)
+
+
+def _list_deserialization_error(rlp, start, sedes, element_exception=None, index=None):
+    """Create the exception :meth:`deserialize` of a list sedes raises for the list at `start`.
+
+    The list is decoded once more for the ``serial`` attribute of the exception, and as a
+    :class:`List` checks the number of elements before deserializing any of them, a wrong length
+    is reported instead of `element_exception`.
+    """
+    serial = _consume_item(rlp, start)[0]
+    if type(sedes) is List and sedes.strict and len(serial) != len(sedes):
+        msg = 'Deserializing list length (%d) does not match sedes (%d)' % (len(serial), len(sedes))
+        return ListDeserializationError(msg, serial)
+    return ListDeserializationError(serial=serial, element_exception=element_exception, index=index)
+
+
+def _deserialize_root_item(rlp, start, end, item, offsets, sedes, kwargs):
+    """Deserialize a decoded item and populate the RLP caches of the result.
+
+    :param offsets: the offsets of the sub-items used to populate the caches of nested objects,
+                    or ``None`` if only the cache of the result itself should be set
+    """
+    obj = sedes.deserialize(item, **kwargs)
+    if offsets is not None:
+        if is_sequence(obj) or _has_rlp_cache(obj):
+            _apply_rlp_cache(obj, offsets, rlp)
+    elif _has_rlp_cache(obj):
+        _cache_encoding(obj, rlp, start, end)
+    return obj
+
+
+def _has_rlp_cache(obj):
+    """Check if a deserialized object has an attribute :attr:`_cached_rlp`.
+
+    :class:`rlp.Serializable` objects are recognized by their type, as the attribute is a property
+    copying the encoding referenced by the cache.
+    """
+    return isinstance(obj, Serializable) or hasattr(obj, '_cached_rlp')
+
+
+def _cache_encoding(obj, rlp, start, end):
+    """Store the encoding ``rlp[start:end]`` of a deserialized object in its RLP cache.
+
+    :class:`rlp.Serializable` objects decoded from a byte string or, in zero copy mode, from a
+    read-only buffer only keep a reference to the slice, which is copied when the cache is
+    accessed. Zero copy mode must not copy the encoding otherwise, so the caches of other objects
+    are left empty. Slices of mutable byte strings are always copied.
+    """
+    if isinstance(rlp, bytes):
+        if start == 0 and end == len(rlp):
+            obj._cached_rlp = rlp
+        elif isinstance(obj, Serializable):
+            obj._rlp_cache = (rlp, start, end)
         else:
-            sub_rlp = split_rlp.pop(0)
-            _apply_rlp_cache(sub, sub_rlp, recursive)
+            obj._cached_rlp = rlp[start:end]
+    elif isinstance(rlp, memoryview):
+        if rlp.readonly and isinstance(obj, Serializable):
+            obj._rlp_cache = (rlp, start, end)
+    else:
+        obj._cached_rlp = bytes(rlp[start:end])
+
+
+# types of deserialized objects that neither have an RLP cache nor contain objects that have one
+_UNCACHED_TYPES = (int, bool, str, bytes, bytearray, memoryview)
+
+
+def _apply_rlp_cache(obj, offsets, rlp):
+    """Populate the RLP caches of a deserialized object and all objects nested inside it.
+
+    The offsets tree is walked by index alongside the object, without modifying it, and children
+    that can't carry a cache are skipped without looking at their offsets. Thus, the cost is
+    linear in the number of nested objects.
+
+    :param offsets: the offsets of the decoded item as returned by :func:`_consume_item`
+    """
+    if isinstance(obj, _UNCACHED_TYPES):
+        return
+    stack = [(obj, offsets)]
+    while stack:
+        obj, offsets = stack.pop()
+        if _has_rlp_cache(obj):
+            start, end = offsets[0]
+            _cache_encoding(obj, rlp, start, end)
+        # offsets[0] is the position of obj itself, followed by the offsets of its children
+        for index, sub in enumerate(obj, 1):
+            if not isinstance(sub, _UNCACHED_TYPES) and index < len(offsets):
+                stack.append((sub, offsets[index]))
 
 
 def infer_sedes(obj):
@@ -282,3 +1210,103 @@ def infer_sedes(obj):
         return text
     msg = 'Did not find sedes handling type {}'.format(type(obj).__name__)
     raise TypeError(msg)
+
+
+# Sedes objects inferred for encoding, keyed by the shape of the encoded objects (see
+# `_infer_shape`). When the cache is full, the oldest entry is evicted. Entries are only added
+# and evicted while holding the lock. Shapes with more than the maximum number of nodes aren't
+# cached, as each entry keeps its shape and a sedes of about the same size alive.
+INFERRED_SEDES_CACHE_SIZE = 1024
+INFERRED_SEDES_MAX_SHAPE_SIZE = 256
+_inferred_sedes_cache = collections.OrderedDict()
+_inferred_sedes_lock = threading.Lock()
+
+# marks the shape of a sequence whose elements all have the same shape
+_HOMOGENEOUS = object()
+
+
+def _infer_encoding_sedes(obj):
+    """Find a sedes object suitable for encoding a given Python object.
+
+    In contrast to :func:`infer_sedes`, sequences whose elements all share the same sedes are
+    encoded with a :class:`rlp.sedes.CountableList` instead of a :class:`rlp.sedes.List` with one
+    entry per element, and the sedes objects for sequences are cached by the shape of the
+    sequence. The result must therefore not be modified.
+    """
+    shape = _infer_shape(obj)
+    if _is_leaf_shape(shape):
+        return shape
+    elif _shape_size(shape, INFERRED_SEDES_MAX_SHAPE_SIZE) > INFERRED_SEDES_MAX_SHAPE_SIZE:
+        return _sedes_for_shape(shape)
+
+    try:
+        return _inferred_sedes_cache[shape]
+    except KeyError:
+        pass
+
+    sedes = _sedes_for_shape(shape)
+    with _inferred_sedes_lock:
+        if len(_inferred_sedes_cache) >= INFERRED_SEDES_CACHE_SIZE:
+            _inferred_sedes_cache.popitem(last=False)
+        _inferred_sedes_cache[shape] = sedes
+    return sedes
+
+
+def _infer_shape(obj):
+    """Compute a hashable description of the sedes :func:`infer_sedes` would return for `obj`.
+
+    The shape of objects with a scalar sedes is the sedes itself. The shape of a sequence is a
+    tuple with the shapes of its elements or, if all elements have the same shape, the tuple
+    ``(_HOMOGENEOUS, element_shape)``.
+    """
+    cls = obj.__class__
+    if cls is int and obj >= 0:
+        return big_endian_int
+    elif cls in _SCALAR_SHAPES:
+        return _SCALAR_SHAPES[cls]
+    elif cls is list or cls is tuple or (is_sequence(obj) and not is_sedes(cls)):
+        element_shapes = list(map(_infer_shape, obj))
+        if element_shapes and element_shapes.count(element_shapes[0]) == len(element_shapes):
+            return (_HOMOGENEOUS, element_shapes[0])
+        else:
+            return tuple(element_shapes)
+    else:
+        return infer_sedes(obj)
+
+
+_SCALAR_SHAPES = {
+    bytes: binary,
+    bytearray: binary,
+    memoryview: binary,
+    bool: boolean,
+    str: text,
+}
+
+
+def _is_leaf_shape(shape):
+    return not isinstance(shape, tuple)
+
+
+def _shape_size(shape, limit):
+    """Count the nodes of a shape, stopping as soon as the count exceeds `limit`."""
+    size = 0
+    stack = [shape]
+    while stack and size <= limit:
+        shape = stack.pop()
+        size += 1
+        if _is_leaf_shape(shape):
+            continue
+        elif shape and shape[0] is _HOMOGENEOUS:
+            stack.append(shape[1])
+        else:
+            stack.extend(shape)
+    return size
+
+
+def _sedes_for_shape(shape):
+    if _is_leaf_shape(shape):
+        return shape
+    elif shape and shape[0] is _HOMOGENEOUS:
+        return CountableList(_sedes_for_shape(shape[1]))
+    else:
+        return List(_sedes_for_shape(element_shape) for element_shape in shape)
@@ -0,0 +1,233 @@
+"""
+An index of the positions of all items in an RLP string, for random access without re-parsing.
+"""
+from array import array
+
+from rlp.codec import _cache_encoding, _decodable, _has_rlp_cache, consume_length_prefix
+from rlp.exceptions import DecodingError
+
+
+# the fields of each record in the index
+KIND = 0
+START = 1
+PAYLOAD_START = 2
+PAYLOAD_END = 3
+CHILD_COUNT = 4
+NEXT_SIBLING = 5
+CHILDREN = 6
+RECORD_SIZE = 7
+
+STRING = 0
+LIST = 1
+
+
+class RLPIndex(object):
+    """An index of all items in an RLP string, built in a single pass.
+
+    Every item is described by a fixed size record in an :class:`array.array`, in the order in
+    which the items appear in the string (so the root item is described by record ``0``). Items
+    are referred to by the number of their record. A record holds the following fields:
+
+    - the kind of the item (:data:`STRING` or :data:`LIST`)
+    - the position at which the item starts
+    - the positions at which its payload starts and ends
+    - for lists, the number of elements
+    - the number of the record following the item and all of its elements (for all items but the
+      last elements of lists, this is the record of the next sibling)
+    - for lists, the position of the list's elements in a table of record numbers
+
+    Once the index is built, any element of any list can be accessed by position in constant
+    time and the length of any list is known, without parsing length prefixes again::
+
+        >>> import rlp
+        >>> index = rlp.RLPIndex(rlp.encode([b'cat', [b'dog', b'cow']]))
+        >>> index.length(index.find(1))
+        2
+        >>> index.item(index.find([1, -1]))
+        b'cow'
+        >>> index.decode([1])
+        [b'dog', b'cow']
+
+    :param rlp: the RLP string to index
+    :param strict: if false, inputs that are longer than the root item don't cause an exception
+    :param zero_copy: if true, `rlp` can be any object supporting the buffer protocol and strings
+                      are returned as :class:`memoryview` slices of it, as described for
+                      :func:`rlp.decode`
+    :param max_depth: the maximum number of nested lists, or ``None`` for no limit
+    :raises: :exc:`rlp.DecodingError` if `rlp` is not a valid RLP string
+    """
+
+    def __init__(self, rlp, strict=True, zero_copy=False, max_depth=None):
+        self.rlp = _decodable(rlp, zero_copy)
+        self.records = array('Q')
+        self.children_table = array('Q')
+        try:
+            self.end = self._build(max_depth)
+        except IndexError:
+            raise DecodingError('RLP string too short', rlp)
+        if strict and self.end != len(self.rlp):
+            msg = 'RLP string ends with {} superfluous bytes'.format(len(self.rlp) - self.end)
+            raise DecodingError(msg, rlp)
+
+    def _build(self, max_depth):
+        rlp = self.rlp
+        records = self.records
+        children_table = self.children_table
+        # unfinished lists as tuples (record, payload end, record numbers of the elements)
+        stack = []
+        count = 0
+        position = 0
+        while True:
+            if stack:
+                record, end, children = stack[-1]
+                if position >= end:
+                    if position > end:
+                        raise DecodingError('List length prefix announced a too small length',
+                                            rlp)
+                    stack.pop()
+                    offset = record * RECORD_SIZE
+                    records[offset + CHILD_COUNT] = len(children)
+                    records[offset + NEXT_SIBLING] = count
+                    records[offset + CHILDREN] = len(children_table)
+                    children_table.extend(children)
+                    if not stack:
+                        return position
+                    continue
+                children.append(count)
+            elif count:
+                return position
+
+            prefix, type_, length, payload_start = consume_length_prefix(rlp, position)
+            payload_end = payload_start + length
+            if payload_end > len(rlp):
+                raise DecodingError('RLP string too short', rlp)
+            if type_ is bytes:
+                records.extend((STRING, position, payload_start, payload_end, 0, count + 1, 0))
+                position = payload_end
+            else:
+                if max_depth is not None and len(stack) >= max_depth:
+                    msg = 'Maximum nesting depth of {} exceeded'.format(max_depth)
+                    raise DecodingError(msg, rlp)
+                records.extend((LIST, position, payload_start, payload_end, 0, 0, 0))
+                stack.append((count, payload_end, []))
+                position = payload_start
+            count += 1
+
+    def __len__(self):
+        """Get the total number of indexed items."""
+        return len(self.records) // RECORD_SIZE
+
+    def _field(self, record, field):
+        if not 0 <= record < len(self):
+            raise IndexError('Record {} out of range'.format(record))
+        return self.records[record * RECORD_SIZE + field]
+
+    def is_list(self, record):
+        """Check if an item is a list."""
+        return self._field(record, KIND) == LIST
+
+    def length(self, record):
+        """Get the number of elements of a list.
+
+        :raises: :exc:`TypeError` if the item is a string
+        """
+        if not self.is_list(record):
+            raise TypeError('Item {} is not a list'.format(record))
+        return self._field(record, CHILD_COUNT)
+
+    def child(self, record, index):
+        """Get the record of an element of a list.
+
+        :param index: the position of the element in the list (negative values count from the
+                      end)
+        :raises: :exc:`IndexError` if `index` is out of range or the item is not a list
+        """
+        if not self.is_list(record):
+            raise IndexError('Too many indices given')
+        count = self._field(record, CHILD_COUNT)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('Index {} out of range'.format(index))
+        return self.children_table[self._field(record, CHILDREN) + index]
+
+    def children(self, record):
+        """Get the records of all elements of a list, in order.
+
+        :raises: :exc:`TypeError` if the item is a string
+        """
+        offset = self._field(record, CHILDREN)
+        return self.children_table[offset:offset + self.length(record)]
+
+    def next_sibling(self, record):
+        """Get the record following an item and all of its elements.
+
+        This is the record of the next element of the same list, unless `record` is the last one.
+        """
+        return self._field(record, NEXT_SIBLING)
+
+    def find(self, path):
+        """Get the record of a nested item.
+
+        :param path: the index of an element of the root list, or a sequence of indices for
+                     nested lists (negative indices count from the end)
+        :raises: :exc:`IndexError` if `path` is invalid (out of range or too many levels)
+        """
+        if isinstance(path, int):
+            path = (path,)
+        record = 0
+        for index in path:
+            record = self.child(record, index)
+        return record
+
+    def payload(self, record):
+        """Get the payload of an item (for lists, the concatenated encodings of the elements)."""
+        return self.rlp[self._field(record, PAYLOAD_START):self._field(record, PAYLOAD_END)]
+
+    def encoding(self, record):
+        """Get the complete RLP encoding of an item."""
+        return self.rlp[self._field(record, START):self._field(record, PAYLOAD_END)]
+
+    def item(self, record=0):
+        """Get a decoded item, constructed from the index without parsing it again."""
+        records = self.records
+        rlp = self.rlp
+        end = self.next_sibling(record)
+        # construct the items of the subtree from the last to the first, so that the elements of
+        # each list are available when it is reached
+        items = [None] * (end - record)
+        for current in range(end - 1, record - 1, -1):
+            offset = current * RECORD_SIZE
+            if records[offset + KIND] == STRING:
+                item = rlp[records[offset + PAYLOAD_START]:records[offset + PAYLOAD_END]]
+            else:
+                children = records[offset + CHILDREN]
+                item = [
+                    items[child - record]
+                    for child in self.children_table[
+                        children:children + records[offset + CHILD_COUNT]
+                    ]
+                ]
+            items[current - record] = item
+        return items[0]
+
+    def decode(self, path=(), sedes=None, **kwargs):
+        """Decode and maybe deserialize a nested item.
+
+        If the deserialized object has an attribute :attr:`_cached_rlp`, it is set to the encoding
+        of the item, as done by :func:`rlp.decode`.
+
+        :param path: the path to the item, as for :meth:`find`
+        :param sedes: an object implementing a function ``deserialize(code)`` which will be applied
+                      after decoding, or ``None`` if no deserialization should be performed
+        :param \\*\\*kwargs: additional keyword arguments that will be passed to the deserializer
+        """
+        record = self.find(path)
+        item = self.item(record)
+        if not sedes:
+            return item
+        obj = sedes.deserialize(item, **kwargs)
+        if _has_rlp_cache(obj):
+            start = self._field(record, START)
+            _cache_encoding(obj, self.rlp, start, self._field(record, PAYLOAD_END))
+        return obj
@@ -0,0 +1,95 @@
+"""
+Deduplication of values that occur repeatedly in decoded data.
+"""
+from collections import OrderedDict
+
+
+DEFAULT_MAX_SIZE = 64 * 1024
+DEFAULT_MIN_LENGTH = 8
+DEFAULT_MAX_LENGTH = 1024
+
+
+class InternTable(object):
+    """A bounded table of decoded values, used to share equal values between decoded objects.
+
+    Decoded data often contains the same values many times, e.g. the addresses and topics in
+    transaction receipts. When decoding with an intern table, each such value is only kept in
+    memory once: strings equal to a string in the table, as well as :class:`rlp.Serializable`
+    objects with the same class and encoding as an object in the table, are replaced by the
+    object from the table. Objects are only interned if they are nested in the decoded object,
+    not the decoded object itself. When the table is full, the least recently used entry is
+    evicted.
+
+    A table can be shared between calls of :func:`rlp.decode` and :func:`rlp.decode_many` to
+    deduplicate values across them.
+
+    :param max_size: the maximum number of entries
+    :param min_length: the minimum length in bytes of strings that are interned. Shorter strings
+                       are cheaper to keep than a table entry.
+    :param max_length: the maximum length in bytes of strings and of the encodings of objects
+                       that are interned. Each entry keeps a copy of the encoding of its object,
+                       so together with `max_size` this limits the memory used by the table.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, min_length=DEFAULT_MIN_LENGTH,
+                 max_length=DEFAULT_MAX_LENGTH):
+        if max_size < 1:
+            raise ValueError('Intern table must have room for at least one entry')
+        self.max_size = max_size
+        self.min_length = min_length
+        self.max_length = max_length
+        self.hits = 0
+        self._entries = OrderedDict()
+
+    def intern(self, string):
+        """Get the string from the table that equals a given one, adding it if there is none.
+
+        :param string: a byte string
+        :returns: `string` or an equal byte string from the table
+        """
+        if not self.min_length <= len(string) <= self.max_length:
+            return string
+        entry = self.get(string)
+        if entry is None:
+            self.add(string, string)
+            return string
+        return entry
+
+    def get(self, key):
+        """Look up an entry, marking it as most recently used.
+
+        :returns: the value of the entry, or ``None`` if there is none for `key`
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def add(self, key, value):
+        """Add an entry, evicting the least recently used entry if the table is full."""
+        if len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+        self._entries[key] = value
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def intern_table(intern):
+    """Get the table to use for an ``intern`` argument: ``True`` for a new one, or ``None``.
+
+    :param intern: an :class:`InternTable`, or a boolean
+    """
+    if isinstance(intern, InternTable):
+        return intern
+    elif intern:
+        return InternTable()
+    else:
+        return None
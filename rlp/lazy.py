@@ -1,11 +1,13 @@
-from collections import Iterable, Sequence
+from array import array
+from collections import Iterable, OrderedDict, Sequence
 
-from .codec import consume_length_prefix, consume_payload
+from .codec import consume_length_prefix
 from .exceptions import DecodingError
 from .atomic import Atomic
+from .limits import Budget
 
 
-def decode_lazy(rlp, sedes=None, **sedes_kwargs):
+def decode_lazy(rlp, sedes=None, limits=None, cache_size=None, **sedes_kwargs):
     """Decode an RLP encoded object in a lazy fashion.
 
     If the encoded object is a bytestring, this function acts similar to
@@ -23,17 +25,27 @@ def decode_lazy(rlp, sedes=None, **sedes_kwargs):
     :param sedes: an object implementing a method ``deserialize(code)`` which
                   is used as described above, or ``None`` if no
                   deserialization should be performed
+    :param limits: a :class:`rlp.DecodeLimits` object restricting the decoded
+                   object, or ``None``. The limits are checked whenever a part
+                   of the object is decoded, so the processor time limit
+                   includes the time that passes between accesses to the
+                   returned list.
+    :param cache_size: the number of decoded elements each :class:`LazyList`
+                       keeps, as described there. By default, all of them are
+                       kept.
     :param \*\*sedes_kwargs: additional keyword arguments that will be passed
                              to the deserializers
     :returns: either the already decoded and deserialized object (if encoded as
               a string) or an instance of :class:`rlp.LazyList`
     """
-    item, end = consume_item_lazy(rlp, 0)
+    budget = None if limits is None else Budget(limits)
+    item, end = _consume_item_lazy(rlp, 0, budget, 0)
     if end != len(rlp):
         raise DecodingError('RLP length prefix announced wrong length', rlp)
     if isinstance(item, LazyList):
         item.sedes = sedes
         item.sedes_kwargs = sedes_kwargs
+        item.cache_size = cache_size
         return item
     elif sedes:
         return sedes.deserialize(item, **sedes_kwargs)
@@ -53,85 +65,148 @@ def consume_item_lazy(rlp, start):
               :class:`LazyList` and ``end`` is the position of the first
               unprocessed byte.
     """
+    return _consume_item_lazy(rlp, start, None, 0)
+
+
+def _consume_item_lazy(rlp, start, budget, depth):
+    """Read an item lazily, checking it against a budget.
+
+    :param budget: a :class:`rlp.limits.Budget`, or ``None`` for no checks
+    :param depth: the number of lists the item is nested in
+    """
     p, t, l, s = consume_length_prefix(rlp, start)
+    if budget is not None:
+        if depth == 0:
+            budget.check_size(s + l - start, rlp)
+        budget.add_item_at(start, t, l, rlp)
     if t is bytes:
-        item, _, end = consume_payload(rlp, p, s, bytes, l)
-        return item, end
+        return rlp[s:s + l], s + l
     else:
         assert t is list
-        return LazyList(rlp, s, s + l), s + l
+        item = LazyList(rlp, s, s + l)
+        if budget is not None:
+            budget.check_depth(depth + 1, rlp)
+            item._budget = budget
+            item._depth = depth + 1
+        return item, s + l
 
 
 class LazyList(Sequence):
     """A RLP encoded list which decodes itself when necessary.
 
-    Both indexing with positive indices and iterating are supported.
-    Getting the length with :func:`len` is possible as well but requires full
-    horizontal encoding.
+    Indexing (with negative indices and slices as well) and iterating are supported. The
+    positions of the elements are found by a scan over their length prefixes, which is only
+    done as far as needed and records them in a compact index. Elements are decoded only when
+    they are accessed, so e.g. :func:`len` or getting the last element doesn't decode any other
+    element.
+
+    By default, decoded elements are kept for later accesses. To scan huge lists with constant
+    memory use, `cache_size` limits the number of kept elements: when it's exceeded, the least
+    recently used element is dropped and decoded again if it's accessed once more. Only the
+    positions of the elements (8 bytes each) are always kept. Nested lists decoded from the
+    elements inherit the cache size.
 
     :param rlp: the rlp string in which the list is encoded
     :param start: the position of the first payload byte of the encoded list
     :param end: the position of the last payload byte of the encoded list
     :param sedes: a sedes object which deserializes each element of the list,
                   or ``None`` for no deserialization
+    :param cache_size: the maximum number of decoded elements kept, ``0`` to not keep any, or
+                       ``None`` to keep all of them
     :param \*\*sedes_kwargs: keyword arguments which will be passed on to the
                              deserializer
     """
 
-    def __init__(self, rlp, start, end, sedes=None, **sedes_kwargs):
+    def __init__(self, rlp, start, end, sedes=None, cache_size=None, **sedes_kwargs):
         self.rlp = rlp
         self.start = start
         self.end = end
+        # the position after the last scanned element
         self.index = start
-        self._elements = []
+        # the positions at which the scanned elements start, followed by self.index
+        self._offsets = array('Q', [start])
+        # the kept decoded elements by index, in the order of their last access
+        self._elements = OrderedDict()
         self._len = None
+        self._next = 0
+        self.cache_size = cache_size
         self.sedes = sedes
         self.sedes_kwargs = sedes_kwargs
-
-    def next(self):
+        self._budget = None
+        self._depth = 1
+
+    def _scan(self, count=None):
+        """Find the positions of the first `count` elements, or of all elements if ``None``.
+
+        :returns: the number of elements whose positions are known
+        """
+        offsets = self._offsets
+        while self.index < self.end and (count is None or len(offsets) <= count):
+            if self._budget is not None:
+                self._budget.check_list_length(len(offsets), self.rlp)
+            p, t, l, s = consume_length_prefix(self.rlp, self.index)
+            if s + l > self.end:
+                raise DecodingError('List length prefix announced a too small length', self.rlp)
+            self.index = s + l
+            offsets.append(self.index)
         if self.index == self.end:
-            self._len = len(self._elements)
-            raise StopIteration
-        assert self.index < self.end
-        item, end = consume_item_lazy(self.rlp, self.index)
-        self.index = end
+            self._len = len(offsets) - 1
+        return len(offsets) - 1
+
+    def _element(self, index):
+        """Get an element whose position has been scanned, decoding it if necessary."""
+        elements = self._elements
+        try:
+            item = elements[index]
+        except KeyError:
+            pass
+        else:
+            if self.cache_size is not None:
+                elements.move_to_end(index)
+            return item
+
+        item, _ = _consume_item_lazy(self.rlp, self._offsets[index], self._budget, self._depth)
+        if isinstance(item, LazyList):
+            item.cache_size = self.cache_size
         if self.sedes:
             item = self.sedes.deserialize(item, **self.sedes_kwargs)
-        self._elements.append(item)
+        if self.cache_size is None:
+            elements[index] = item
+        elif self.cache_size > 0:
+            if len(elements) >= self.cache_size:
+                elements.popitem(last=False)
+            elements[index] = item
+        return item
+
+    def next(self):
+        """Get the element following the one returned by the previous call."""
+        if self._scan(self._next + 1) <= self._next:
+            raise StopIteration
+        item = self._element(self._next)
+        self._next += 1
         return item
 
     def __getitem__(self, i):
         if isinstance(i, slice):
-            if i.step is not None:
-                raise TypeError("Step not supported")
-            start = i.start
-            stop = i.stop
+            start, stop, step = i.start, i.stop, i.step
+            if (start or 0) >= 0 and stop is not None and stop >= 0 and (step or 1) > 0:
+                # only the elements up to stop need to be scanned
+                length = self._scan(stop)
+            else:
+                length = len(self)
+            return [self._element(index) for index in range(*i.indices(length))]
+
+        if i < 0:
+            index = i + len(self)
         else:
-            start = i
-            stop = i + 1
-
-        if stop is None:
-            stop = self.end - 1
-
-        try:
-            while len(self._elements) < stop:
-                self.next()
-        except StopIteration:
-            assert self.index == self.end
+            index = i
+        if index < 0 or self._scan(index + 1) <= index:
             raise IndexError('Index %s out of range' % i)
-
-        if isinstance(i, slice):
-            return self._elements[start:stop]
-        else:
-            return self._elements[start]
+        return self._element(index)
 
     def __len__(self):
-        if not self._len:
-            try:
-                while True:
-                    self.next()
-            except StopIteration:
-                self._len = len(self._elements)
+        if self._len is None:
+            self._scan()
         return self._len
 
 
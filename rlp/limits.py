@@ -0,0 +1,137 @@
+"""
+Limits on the resources spent on decoding untrusted input.
+"""
+import time
+
+from rlp.exceptions import DecodingError
+
+
+# the number of items after which the deadline is checked again
+DEADLINE_CHECK_INTERVAL = 64
+
+
+class DecodeLimits(object):
+    """Limits on the size and structure of decoded objects and the time spent on decoding them.
+
+    All limits are checked while parsing, as soon as the data exceeding them is reached, so that
+    decoding fails early instead of first processing all of the input. They apply to each decoded
+    object separately and are optional: a limit set to ``None`` is not checked.
+
+    :param max_size: the maximum length of the encoded object in bytes
+    :param max_items: the maximum total number of strings and lists in the object
+    :param max_string_length: the maximum length of each string in bytes
+    :param max_list_length: the maximum number of elements of each list
+    :param max_depth: the maximum number of nested lists (e.g. 1 for a list of strings)
+    :param max_time: the maximum processor time in seconds (as measured by
+                     :func:`time.process_time`) spent on parsing the object, including its
+                     deserialization if it is decoded with a sedes
+    """
+
+    def __init__(self, max_size=None, max_items=None, max_string_length=None,
+                 max_list_length=None, max_depth=None, max_time=None):
+        self.max_size = max_size
+        self.max_items = max_items
+        self.max_string_length = max_string_length
+        self.max_list_length = max_list_length
+        self.max_depth = max_depth
+        self.max_time = max_time
+
+    def __repr__(self):
+        limits = (
+            '{}={!r}'.format(name, value)
+            for name, value in sorted(vars(self).items())
+            if value is not None
+        )
+        return '{}({})'.format(type(self).__name__, ', '.join(limits))
+
+
+class Budget(object):
+    """The resources left for decoding a single object under some :class:`DecodeLimits`.
+
+    :param limits: the limits to enforce
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.items = 0
+        # the positions of the items counted so far, only needed to count items decoded again
+        # (see add_item_at) and thus bounded by the maximum number of items
+        self._positions = None if limits.max_items is None else set()
+        if limits.max_time is None:
+            self.deadline = None
+        else:
+            self.deadline = time.process_time() + limits.max_time
+
+    def check_size(self, size, rlp):
+        """Check the length of the encoded object in bytes."""
+        max_size = self.limits.max_size
+        if max_size is not None and size > max_size:
+            msg = 'Encoded object of {} bytes exceeds the limit of {} bytes'.format(size, max_size)
+            raise DecodingError(msg, rlp)
+
+    def check_depth(self, depth, rlp):
+        """Check the number of lists a list is nested in, including itself."""
+        max_depth = self.limits.max_depth
+        if max_depth is not None and depth > max_depth:
+            raise DecodingError('Maximum nesting depth of {} exceeded'.format(max_depth), rlp)
+
+    def check_list_length(self, length, rlp):
+        """Check the number of elements of a list found so far."""
+        max_list_length = self.limits.max_list_length
+        if max_list_length is not None and length > max_list_length:
+            msg = 'List has more than the maximum of {} elements'.format(max_list_length)
+            raise DecodingError(msg, rlp)
+
+    def check_string_length(self, length, rlp):
+        """Check the length of a string in bytes."""
+        max_string_length = self.limits.max_string_length
+        if max_string_length is not None and length > max_string_length:
+            msg = 'String of {} bytes exceeds the limit of {} bytes'.format(
+                length, max_string_length)
+            raise DecodingError(msg, rlp)
+
+    def check_header(self, header, item_length):
+        """Check an object based on its header, before the rest of it is read.
+
+        :param header: the header of the encoded object (see :func:`rlp.codec._header_length`)
+        :param item_length: the total length of the encoded object announced by the header
+        """
+        self.check_size(item_length, header)
+        if header[0] < 128:
+            self.check_string_length(1, header)
+        elif header[0] < 192:
+            self.check_string_length(item_length - len(header), header)
+        else:
+            self.check_depth(1, header)
+
+    def add_item(self, type_, length, rlp):
+        """Account for a new item, checking the number of items, its length and the deadline.
+
+        :param type_: the type of the item, ``bytes`` or ``list``
+        :param length: the length of the item's payload in bytes
+        """
+        limits = self.limits
+        self.items += 1
+        if limits.max_items is not None and self.items > limits.max_items:
+            msg = 'Object has more than the maximum of {} items'.format(limits.max_items)
+            raise DecodingError(msg, rlp)
+        if type_ is bytes:
+            self.check_string_length(length, rlp)
+        if self.deadline is not None and self.items % DEADLINE_CHECK_INTERVAL == 1 and \
+                time.process_time() > self.deadline:
+            msg = 'Decoding exceeded the time limit of {} seconds'.format(limits.max_time)
+            raise DecodingError(msg, rlp)
+
+    def add_item_at(self, position, type_, length, rlp):
+        """Account for the item at a position of the encoding, unless it has been counted before.
+
+        This is used for items that may be decoded more than once, e.g. the elements of a
+        :class:`rlp.LazyList` that have been dropped from its cache. They count as a single item.
+
+        :param position: the position at which the encoded item starts
+        """
+        if self._positions is not None:
+            if position in self._positions:
+                return
+            self._positions.add(position)
+        self.add_item(type_, length, rlp)
@@ -0,0 +1,109 @@
+"""
+Encoding of large lists using multiple processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from rlp.codec import _infer_encoding_sedes
+from rlp.exceptions import (
+    EncodingError,
+    ListSerializationError,
+    SerializationError,
+)
+from rlp.sedes.lists import CountableList, List
+from rlp.segments import (
+    append_serialized_segments,
+    encodes_segments,
+    length_prefix,
+)
+
+
+def encode_parallel(obj, sedes=None, executor=None, max_workers=None, chunk_length=None):
+    """Encode a large list in RLP format, encoding its elements in multiple processes.
+
+    The elements are split into chunks which are encoded by the worker processes of a
+    :class:`concurrent.futures.ProcessPoolExecutor`, while the length prefix of the list is
+    computed in the calling process. The result is identical to the one of :func:`rlp.encode`.
+
+    As elements and sedes objects have to be sent to the worker processes, both need to be
+    picklable. Cached encodings of :class:`rlp.Serializable` elements are sent along and reused.
+    Parallel encoding only pays off for lists with many or expensive to encode elements.
+
+    :param obj: the sequence to encode
+    :param sedes: a :class:`rlp.sedes.CountableList` or :class:`rlp.sedes.List` used to serialize
+                  `obj`, or ``None`` to infer it
+    :param executor: the :class:`concurrent.futures.ProcessPoolExecutor` to use, or ``None`` to
+                     create one for this call only
+    :param max_workers: the number of worker processes if `executor` is not given (by default,
+                        the number of CPUs)
+    :param chunk_length: the number of elements encoded by a worker at once, or ``None`` to split
+                         the list into four chunks per worker
+    :returns: the RLP encoded list
+    :raises: :exc:`rlp.EncodingError` if the list is too big to encode
+    :raises: :exc:`rlp.SerializationError` if the serialization fails
+    """
+    if sedes is None:
+        sedes = _infer_encoding_sedes(obj)
+    if not isinstance(sedes, (CountableList, List)) or not encodes_segments(sedes):
+        raise TypeError(
+            'Parallel encoding requires a CountableList or List sedes without custom serialization'
+        )
+    sedes._validate_serializable(obj)
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as own_executor:
+            return encode_parallel(obj, sedes, own_executor, max_workers, chunk_length)
+
+    if isinstance(sedes, CountableList):
+        element_sedes = [sedes.element_sedes] * len(obj)
+    else:
+        element_sedes = list(sedes)
+    if chunk_length is None:
+        workers = max_workers or os.cpu_count() or 1
+        chunk_length = max(1, -(-len(obj) // (workers * 4)))
+
+    starts = range(0, len(obj), chunk_length)
+    futures = [
+        executor.submit(
+            _encode_chunk,
+            list(obj[start:start + chunk_length]),
+            element_sedes[start:start + chunk_length],
+        )
+        for start in starts
+    ]
+
+    payloads = []
+    for start, future in zip(starts, futures):
+        payload, failed_index = future.result()
+        if failed_index is not None:
+            # re-raise the serialization error in this process, as exceptions of this package
+            # can't be passed back from the workers
+            index = start + failed_index
+            try:
+                append_serialized_segments(obj[index], element_sedes[index], [])
+            except SerializationError as e:
+                raise ListSerializationError(obj=obj, element_exception=e, index=index)
+            raise AssertionError('Element failed to serialize only in worker process')
+        payloads.append(payload)
+
+    payload_length = sum(len(payload) for payload in payloads)
+    try:
+        prefix = length_prefix(payload_length, 192)
+    except ValueError:
+        raise EncodingError('Item too big to encode', obj)
+    return b''.join([prefix] + payloads)
+
+
+def _encode_chunk(elements, element_sedes):
+    """Encode the elements of a chunk in a worker process.
+
+    :returns: a tuple ``(payload, failed_index)`` with the concatenated encodings of the
+              elements, or ``None`` and the index of the first element that failed to serialize
+    """
+    segments = []
+    for index, (element, sedes) in enumerate(zip(elements, element_sedes)):
+        try:
+            append_serialized_segments(element, sedes, segments)
+        except SerializationError:
+            return None, index
+    return b''.join(segments), None
@@ -4,6 +4,7 @@ from eth_utils import (
 )
 
 from rlp.exceptions import DeserializationError, SerializationError
+from rlp.segments import append_string_segments, length_prefix_size
 
 
 class BigEndianInt(object):
@@ -16,7 +17,7 @@ class BigEndianInt(object):
     def __init__(self, l=None):
         self.l = l
 
-    def serialize(self, obj):
+    def _validate(self, obj):
         if isinstance(obj, bool) or not isinstance(obj, int):
             raise SerializationError('Can only serialize integers', obj)
         if self.l is not None and obj >= 256**self.l:
@@ -25,6 +26,8 @@ class BigEndianInt(object):
         if obj < 0:
             raise SerializationError('Cannot serialize negative integers', obj)
 
+    def serialize(self, obj):
+        self._validate(obj)
         if obj == 0:
             s = b''
         else:
@@ -35,6 +38,19 @@ class BigEndianInt(object):
         else:
             return s
 
+    def encode_segments(self, obj, segments):
+        return append_string_segments(self.serialize(obj), segments)
+
+    def encoded_length(self, obj):
+        self._validate(obj)
+        if self.l is None:
+            length = (obj.bit_length() + 7) // 8
+        else:
+            length = self.l
+        if length == 1 and obj < 128:
+            return 1
+        return length_prefix_size(length) + length
+
     def deserialize(self, serial):
         if self.l is not None and len(serial) != self.l:
             raise DeserializationError('Invalid serialization (wrong size)',
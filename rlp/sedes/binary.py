@@ -1,5 +1,6 @@
 from rlp.exceptions import SerializationError, DeserializationError
 from rlp.atomic import Atomic
+from rlp.segments import append_string_segments, byte_view, raw_encoded_length
 
 
 class Binary(object):
@@ -26,7 +27,7 @@ class Binary(object):
 
     @classmethod
     def is_valid_type(cls, obj):
-        return isinstance(obj, (bytes, bytearray))
+        return isinstance(obj, (bytes, bytearray, memoryview))
 
     def is_valid_length(self, l):
         return any((self.min_length <= l <= self.max_length,
@@ -35,12 +36,20 @@ class Binary(object):
     def serialize(self, obj):
         if not Binary.is_valid_type(obj):
             raise SerializationError('Object is not a serializable ({})'.format(type(obj)), obj)
+        if isinstance(obj, memoryview):
+            obj = byte_view(obj)
 
         if not self.is_valid_length(len(obj)):
             raise SerializationError('Object has invalid length', obj)
 
         return obj
 
+    def encode_segments(self, obj, segments):
+        return append_string_segments(self.serialize(obj), segments)
+
+    def encoded_length(self, obj):
+        return raw_encoded_length(self.serialize(obj))
+
     def deserialize(self, serial):
         if not isinstance(serial, Atomic):
             m = 'Objects of type {} cannot be deserialized'
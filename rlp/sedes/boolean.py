@@ -2,15 +2,18 @@ from rlp.exceptions import (
     DeserializationError,
     SerializationError,
 )
+from rlp.segments import append_string_segments
 
 
 class Boolean:
     """A sedes for booleans
     """
-    def serialize(self, obj):
+    def _validate(self, obj):
         if not isinstance(obj, bool):
             raise SerializationError('Can only serialize integers', obj)
 
+    def serialize(self, obj):
+        self._validate(obj)
         if obj is False:
             return b''
         elif obj is True:
@@ -18,6 +21,14 @@ class Boolean:
         else:
             raise Exception("Invariant: no other options for boolean values")
 
+    def encode_segments(self, obj, segments):
+        return append_string_segments(self.serialize(obj), segments)
+
+    def encoded_length(self, obj):
+        # both values are encoded as a single byte
+        self._validate(obj)
+        return 1
+
     def deserialize(self, serial):
         if serial == b'':
             return False
@@ -15,6 +15,14 @@ from rlp.exceptions import (
     ListDeserializationError,
 )
 
+from rlp.segments import (
+    append_serialized_segments,
+    close_list_segments,
+    list_encoded_length,
+    open_list_segments,
+    serialized_encoded_length,
+)
+
 from .binary import (
     Binary as BinaryClass,
 )
@@ -61,8 +69,7 @@ class List(list):
                         'nested sequences thereof.'
                     )
 
-    @to_list
-    def serialize(self, obj):
+    def _validate_serializable(self, obj):
         if not is_sequence(obj):
             raise ListSerializationError('Can only serialize sequences', obj)
         if self.strict and len(self) != len(obj):
@@ -71,12 +78,39 @@ class List(list):
                     len(obj), len(self)),
                 obj)
 
+    @to_list
+    def serialize(self, obj):
+        self._validate_serializable(obj)
+
         for index, (element, sedes) in enumerate(zip(obj, self)):
             try:
                 yield sedes.serialize(element)
             except SerializationError as e:
                 raise ListSerializationError(obj=obj, element_exception=e, index=index)
 
+    def encode_segments(self, obj, segments):
+        self._validate_serializable(obj)
+
+        prefix_index = open_list_segments(segments)
+        payload_length = 0
+        for index, (element, sedes) in enumerate(zip(obj, self)):
+            try:
+                payload_length += append_serialized_segments(element, sedes, segments)
+            except SerializationError as e:
+                raise ListSerializationError(obj=obj, element_exception=e, index=index)
+        return close_list_segments(segments, prefix_index, payload_length, obj)
+
+    def encoded_length(self, obj):
+        self._validate_serializable(obj)
+
+        payload_length = 0
+        for index, (element, sedes) in enumerate(zip(obj, self)):
+            try:
+                payload_length += serialized_encoded_length(element, sedes)
+            except SerializationError as e:
+                raise ListSerializationError(obj=obj, element_exception=e, index=index)
+        return list_encoded_length(payload_length, obj)
+
     @to_tuple
     def deserialize(self, serial):
         if not is_sequence(serial):
@@ -108,8 +142,7 @@ class CountableList(object):
         self.element_sedes = element_sedes
         self.max_length = max_length
 
-    @to_list
-    def serialize(self, obj):
+    def _validate_serializable(self, obj):
         if not is_sequence(obj):
             raise ListSerializationError('Can only serialize sequences', obj)
 
@@ -122,12 +155,41 @@ class CountableList(object):
                 obj=obj,
             )
 
+    @to_list
+    def serialize(self, obj):
+        self._validate_serializable(obj)
+
         for index, element in enumerate(obj):
             try:
                 yield self.element_sedes.serialize(element)
             except SerializationError as e:
                 raise ListSerializationError(obj=obj, element_exception=e, index=index)
 
+    def encode_segments(self, obj, segments):
+        self._validate_serializable(obj)
+
+        element_sedes = self.element_sedes
+        prefix_index = open_list_segments(segments)
+        payload_length = 0
+        for index, element in enumerate(obj):
+            try:
+                payload_length += append_serialized_segments(element, element_sedes, segments)
+            except SerializationError as e:
+                raise ListSerializationError(obj=obj, element_exception=e, index=index)
+        return close_list_segments(segments, prefix_index, payload_length, obj)
+
+    def encoded_length(self, obj):
+        self._validate_serializable(obj)
+
+        element_sedes = self.element_sedes
+        payload_length = 0
+        for index, element in enumerate(obj):
+            try:
+                payload_length += serialized_encoded_length(element, element_sedes)
+            except SerializationError as e:
+                raise ListSerializationError(obj=obj, element_exception=e, index=index)
+        return list_encoded_length(payload_length, obj)
+
     @to_tuple
     def deserialize(self, serial):
         if not is_sequence(serial):
@@ -17,6 +17,11 @@ from rlp.exceptions import (
     ObjectDeserializationError,
 )
 
+from rlp.segments import (
+    append_serialized_segments,
+    serialized_encoded_length,
+)
+
 from .lists import (
     List,
 )
@@ -205,7 +210,41 @@ class BaseSerializable(collections.Sequence):
         for value, attr in zip(field_values, self._meta.field_attrs):
             setattr(self, attr, make_immutable(value))
 
-    _cached_rlp = None
+    # The encoding of the object if it is known, either as a byte string or as a tuple
+    # ``(buffer, start, end)`` referring to a slice of the buffer it has been decoded from. The
+    # latter lets all objects decoded from the same buffer share it instead of holding copies.
+    _rlp_cache = None
+
+    @property
+    def _cached_rlp(self):
+        rlp_cache = self._rlp_cache
+        if type(rlp_cache) is tuple:
+            buffer, start, end = rlp_cache
+            rlp_cache = self._rlp_cache = bytes(buffer[start:end])
+        return rlp_cache
+
+    @_cached_rlp.setter
+    def _cached_rlp(self, value):
+        self._rlp_cache = value
+
+    def _cached_rlp_view(self):
+        """Get the cached encoding without copying it out of the buffer it has been decoded from.
+
+        :returns: a byte string or :class:`memoryview`, or ``None`` if no encoding is cached
+        """
+        rlp_cache = self._rlp_cache
+        if type(rlp_cache) is tuple:
+            buffer, start, end = rlp_cache
+            return memoryview(buffer)[start:end]
+        return rlp_cache
+
+    def _cached_rlp_length(self):
+        rlp_cache = self._rlp_cache
+        if type(rlp_cache) is tuple:
+            return rlp_cache[2] - rlp_cache[1]
+        elif rlp_cache:
+            return len(rlp_cache)
+        return 0
 
     def as_dict(self):
         return dict(
@@ -238,6 +277,10 @@ class BaseSerializable(collections.Sequence):
 
     def __getstate__(self):
         state = self.__dict__.copy()
+        # Cached encodings referring to a larger buffer are copied, so that the buffer isn't
+        # pickled along
+        if '_rlp_cache' in state:
+            state['_rlp_cache'] = self._cached_rlp
         # The hash() builtin is not stable across processes
         # (https://docs.python.org/3/reference/datamodel.html#object.__hash__), so we do this here
         # to ensure pickled instances don't carry the cached hash() as that may cause issues like
@@ -260,6 +303,32 @@ class BaseSerializable(collections.Sequence):
         except ListSerializationError as e:
             raise ObjectSerializationError(obj=obj, sedes=cls, list_exception=e)
 
+    @classmethod
+    def encode_segments(cls, obj, segments):
+        # Objects of exactly this class that have been encoded or decoded before carry their
+        # encoding, which is spliced in verbatim. This lets e.g. blocks be re-encoded without
+        # re-encoding the transactions inside.
+        cached_length = obj._cached_rlp_length() if obj.__class__ is cls else 0
+        if cached_length:
+            segments.append(obj._cached_rlp_view())
+            return cached_length
+
+        try:
+            return append_serialized_segments(obj, cls._meta.sedes, segments)
+        except ListSerializationError as e:
+            raise ObjectSerializationError(obj=obj, sedes=cls, list_exception=e)
+
+    @classmethod
+    def encoded_length(cls, obj):
+        cached_length = obj._cached_rlp_length() if obj.__class__ is cls else 0
+        if cached_length:
+            return cached_length
+
+        try:
+            return serialized_encoded_length(obj, cls._meta.sedes)
+        except ListSerializationError as e:
+            raise ObjectSerializationError(obj=obj, sedes=cls, list_exception=e)
+
     @classmethod
     def deserialize(cls, serial, **extra_kwargs):
         try:
@@ -1,5 +1,6 @@
 from rlp.exceptions import SerializationError, DeserializationError
 from rlp.atomic import Atomic
+from rlp.segments import append_string_segments, raw_encoded_length
 
 
 class Text:
@@ -44,13 +45,19 @@ class Text:
 
         return obj.encode(self.encoding)
 
+    def encode_segments(self, obj, segments):
+        return append_string_segments(self.serialize(obj), segments)
+
+    def encoded_length(self, obj):
+        return raw_encoded_length(self.serialize(obj))
+
     def deserialize(self, serial):
         if not isinstance(serial, Atomic):
             m = 'Objects of type {} cannot be deserialized'
             raise DeserializationError(m.format(type(serial).__name__), serial)
 
         try:
-            text_value = serial.decode(self.encoding)
+            text_value = str(serial, self.encoding)
         except UnicodeDecodeError as err:
             raise DeserializationError(str(err), serial)
 
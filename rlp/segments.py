@@ -0,0 +1,320 @@
+"""
+Building blocks for encoders that collect the RLP encoding of an object as a flat list of
+segments instead of concatenating the encodings of nested items level by level.
+
+The encoding of an object equals the concatenation of its segments. Payloads are referenced, not
+copied, so the final result can be assembled with a single copy of each byte, e.g. with
+``b''.join(segments)`` or :func:`write_segments`.
+"""
+from collections import OrderedDict, Sequence
+import threading
+
+from eth_utils import (
+    int_to_big_endian,
+)
+
+from rlp.atomic import Atomic
+from rlp.exceptions import EncodingError
+from rlp.utils import ALL_BYTES
+
+
+LONG_LENGTH = 256**8
+
+
+def length_prefix(length, offset):
+    """Construct the prefix to lists or strings denoting their length.
+
+    :param length: the length of the item in bytes
+    :param offset: ``0x80`` when encoding raw bytes, ``0xc0`` when encoding a
+                   list
+    """
+    if length < 56:
+        return ALL_BYTES[offset + length]
+    elif length < LONG_LENGTH:
+        length_string = int_to_big_endian(length)
+        return ALL_BYTES[offset + 56 - 1 + len(length_string)] + length_string
+    else:
+        raise ValueError('Length greater than 256**8')
+
+
+def length_prefix_size(length):
+    """Compute the size of the prefix :func:`length_prefix` constructs for a given length.
+
+    :param length: the length of the item in bytes
+    """
+    if length < 56:
+        return 1
+    elif length < LONG_LENGTH:
+        return 1 + (length.bit_length() + 7) // 8
+    else:
+        raise ValueError('Length greater than 256**8')
+
+
+def byte_view(view):
+    """Get a flat view of unsigned bytes of a :class:`memoryview` of any format and shape.
+
+    The length of views of other formats counts their elements, not their bytes, so they have to
+    be cast before being encoded. Non-contiguous views are copied.
+    """
+    if view.format == 'B' and view.ndim == 1 and view.c_contiguous:
+        return view
+    elif view.c_contiguous:
+        return view.cast('B')
+    else:
+        return memoryview(view.tobytes())
+
+
+def append_string_segments(string, segments):
+    """Append the segments encoding a single :class:`Atomic` to a list.
+
+    :param string: the string to encode
+    :param segments: a list to which the segments are appended
+    :returns: the total length of the appended segments in bytes
+    :raises: :exc:`rlp.EncodingError` if `string` is too long to be encoded
+    """
+    if isinstance(string, memoryview):
+        string = byte_view(string)
+    length = len(string)
+    if length == 1 and string[0] < 128:
+        segments.append(string)
+        return 1
+
+    try:
+        prefix = length_prefix(length, 128)
+    except ValueError:
+        raise EncodingError('Item too big to encode', string)
+
+    segments.append(prefix)
+    segments.append(string)
+    return len(prefix) + length
+
+
+def open_list_segments(segments):
+    """Reserve the segment holding the prefix of a list whose elements are appended next.
+
+    :returns: the index of the reserved segment, to be passed to :func:`close_list_segments`
+    """
+    segments.append(b'')
+    return len(segments) - 1
+
+
+def close_list_segments(segments, prefix_index, payload_length, obj):
+    """Fill in the prefix of a list after all of its elements have been appended.
+
+    :param prefix_index: the index returned by :func:`open_list_segments`
+    :param payload_length: the total length of the segments appended for the elements
+    :param obj: the encoded object, used for error reporting
+    :returns: the total length of the segments encoding the list
+    :raises: :exc:`rlp.EncodingError` if the list is too long to be encoded
+    """
+    try:
+        prefix = length_prefix(payload_length, 192)
+    except ValueError:
+        raise EncodingError('Item too big to encode', obj)
+
+    segments[prefix_index] = prefix
+    return len(prefix) + payload_length
+
+
+def list_encoded_length(payload_length, obj):
+    """Compute the length of the encoding of a list from the total length of its encoded elements.
+
+    :param obj: the encoded object, used for error reporting
+    :raises: :exc:`rlp.EncodingError` if the list is too long to be encoded
+    """
+    try:
+        return length_prefix_size(payload_length) + payload_length
+    except ValueError:
+        raise EncodingError('Item too big to encode', obj)
+
+
+def append_raw_segments(item, segments, max_depth=None):
+    """Append the segments encoding (a nested sequence of) :class:`Atomic`s to a list.
+
+    Nested sequences are traversed with an explicit stack instead of recursion, so arbitrarily
+    deep nesting neither hits Python's recursion limit nor costs a function call per level.
+
+    :param item: the item to encode
+    :param segments: a list to which the segments are appended
+    :param max_depth: the maximum number of nested sequences, or ``None`` for no limit
+    :returns: the total length of the appended segments in bytes
+    :raises: :exc:`rlp.EncodingError` if `item` contains objects that can't be encoded or is
+             nested deeper than `max_depth`
+    """
+    if isinstance(item, Atomic):
+        return append_string_segments(item, segments)
+    _check_raw_list(item, 1, max_depth)
+
+    stack = []
+    prefix_index = open_list_segments(segments)
+    length = 0
+    elements = iter(item)
+    while True:
+        for element in elements:
+            if isinstance(element, Atomic):
+                length += append_string_segments(element, segments)
+            else:
+                _check_raw_list(element, len(stack) + 2, max_depth)
+                # descend into the nested sequence
+                stack.append((item, elements, prefix_index, length))
+                item = element
+                elements = iter(element)
+                prefix_index = open_list_segments(segments)
+                length = 0
+                break
+        else:
+            length = close_list_segments(segments, prefix_index, length, item)
+            if not stack:
+                return length
+            # the nested sequence is complete, continue with its parent
+            item, elements, prefix_index, parent_length = stack.pop()
+            length += parent_length
+
+
+def _check_raw_list(item, depth, max_depth):
+    if isinstance(item, str) or not isinstance(item, Sequence):
+        msg = 'Cannot encode object of type {0}'.format(type(item).__name__)
+        raise EncodingError(msg, item)
+    elif max_depth is not None and depth > max_depth:
+        raise EncodingError('Maximum nesting depth of {} exceeded'.format(max_depth), item)
+
+
+def append_serialized_segments(obj, sedes, segments):
+    """Serialize an object and append the segments encoding the result to a list.
+
+    Sedes objects can provide a method ``encode_segments(obj, segments)`` that appends the
+    segments directly, without building the intermediate serialization. It is only used if it is
+    defined in the same class as ``serialize`` or in a subclass of it, so that subclasses
+    overriding ``serialize`` keep their custom serialization. For all other sedes objects,
+    ``serialize(obj)`` is called and its result encoded.
+
+    :param obj: the object to serialize and encode
+    :param sedes: the sedes object to use
+    :param segments: a list to which the segments are appended
+    :returns: the total length of the appended segments in bytes
+    :raises: :exc:`rlp.SerializationError` if the serialization fails
+    """
+    if encodes_segments(sedes):
+        return sedes.encode_segments(obj, segments)
+    else:
+        return append_raw_segments(sedes.serialize(obj), segments)
+
+
+def encodes_segments(sedes):
+    """Check if the ``encode_segments`` method of a sedes object can be used for encoding.
+
+    This is the case if the method exists and ``serialize`` isn't overridden below the class
+    defining it.
+    """
+    return _uses_method(sedes, 'encode_segments')
+
+
+def serialized_encoded_length(obj, sedes):
+    """Compute the length of the encoding of an object serialized by a sedes object.
+
+    Sedes objects can provide a method ``encoded_length(obj)`` that computes the length without
+    building the serialization or the encoding, e.g. from the bit length of an integer. It is
+    used under the same condition as ``encode_segments`` (see :func:`append_serialized_segments`),
+    and additionally only if ``encode_segments`` isn't overridden below the class defining it.
+    For all other sedes objects, the length of the encoding of ``serialize(obj)`` is computed.
+
+    :returns: the length of the encoding in bytes
+    :raises: :exc:`rlp.SerializationError` if the serialization fails
+    """
+    if _uses_method(sedes, 'encoded_length'):
+        return sedes.encoded_length(obj)
+    else:
+        return raw_encoded_length(sedes.serialize(obj))
+
+
+def _uses_method(sedes, name):
+    """Check if a method of a sedes object is defined in the same class as or below the methods
+    it replaces, and is not shadowed by a field of a :class:`rlp.Serializable`.
+    """
+    cls = sedes if isinstance(sedes, type) else type(sedes)
+    try:
+        return _sedes_methods[cls, name]
+    except KeyError:
+        pass
+    result = False
+    for base in cls.__mro__:
+        namespace = vars(base)
+        if name in namespace:
+            result = not isinstance(namespace[name], property)
+            break
+        elif 'serialize' in namespace or 'encode_segments' in namespace:
+            break
+    with _sedes_methods_lock:
+        if len(_sedes_methods) >= SEDES_METHODS_CACHE_SIZE:
+            _sedes_methods.popitem(last=False)
+        _sedes_methods[cls, name] = result
+    return result
+
+
+# Results of `_uses_method` by sedes class and method name. When the cache is full, the oldest
+# entry is evicted. Entries are only added and evicted while holding the lock.
+SEDES_METHODS_CACHE_SIZE = 1024
+_sedes_methods = OrderedDict()
+_sedes_methods_lock = threading.Lock()
+
+
+def raw_encoded_length(item):
+    """Compute the length of the RLP encoding of (a nested sequence of) :class:`Atomic`s.
+
+    Nested sequences are traversed with an explicit stack, as in :func:`append_raw_segments`.
+
+    :raises: :exc:`rlp.EncodingError` if `item` contains objects that can't be encoded
+    """
+    if isinstance(item, Atomic):
+        return _string_encoded_length(item)
+    _check_raw_list(item, 1, None)
+
+    stack = []
+    length = 0
+    elements = iter(item)
+    while True:
+        for element in elements:
+            if isinstance(element, Atomic):
+                length += _string_encoded_length(element)
+            else:
+                _check_raw_list(element, len(stack) + 2, None)
+                # descend into the nested sequence
+                stack.append((item, elements, length))
+                item = element
+                elements = iter(element)
+                length = 0
+                break
+        else:
+            length = list_encoded_length(length, item)
+            if not stack:
+                return length
+            # the nested sequence is complete, continue with its parent
+            item, elements, parent_length = stack.pop()
+            length += parent_length
+
+
+def _string_encoded_length(string):
+    if isinstance(string, memoryview):
+        string = byte_view(string)
+    length = len(string)
+    if length == 1 and string[0] < 128:
+        return 1
+    try:
+        return length_prefix_size(length) + length
+    except ValueError:
+        raise EncodingError('Item too big to encode', string)
+
+
+def write_segments(segments, buffer, offset):
+    """Copy a list of segments back to back into a buffer.
+
+    :param segments: the segments to copy
+    :param buffer: a writable :class:`memoryview` of bytes large enough to hold all segments
+    :param offset: the position in `buffer` at which the first segment is written
+    :returns: the position after the last written byte
+    """
+    for segment in segments:
+        end = offset + len(segment)
+        buffer[offset:end] = segment
+        offset = end
+    return offset
@@ -0,0 +1,407 @@
+"""
+Encoding and decoding of RLP data that is too large to be held in memory at once.
+"""
+from collections import Iterable, Iterator
+import io
+
+from rlp.codec import (
+    _header_length,
+    _infer_encoding_sedes,
+    _item_length,
+    decode,
+)
+from rlp.exceptions import (
+    DecodingError,
+    EncodingError,
+    ListSerializationError,
+    SerializationError,
+)
+from rlp.limits import Budget
+from rlp.sedes.binary import Binary as BinaryClass
+from rlp.sedes.lists import CountableList, is_sequence
+from rlp.sedes.serializable import Serializable
+from rlp.segments import (
+    LONG_LENGTH,
+    append_serialized_segments,
+    encodes_segments,
+    length_prefix,
+    length_prefix_size,
+    list_encoded_length,
+    serialized_encoded_length,
+)
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# the maximum number of buffers in a chunk, chosen to not exceed IOV_MAX on common platforms
+MAX_VECTOR_LENGTH = 1024
+
+
+def iterencode(obj, sedes=None, chunk_size=DEFAULT_CHUNK_SIZE, vectors=False):
+    """Encode a Python object in RLP format in chunks.
+
+    Values serialized by a :class:`rlp.sedes.CountableList` (including lists of elements of the
+    same type if `sedes` is inferred) are encoded element by element, so that at no time more
+    than a single element has to be held in memory in encoded form. The length of such a list is
+    computed by a first pass over its elements, so instead of a sequence any iterable that can
+    be iterated over repeatedly (but not a one-shot iterator) can be given for it. As for
+    :func:`rlp.encode`, the depth of nested lists is limited by Python's recursion limit.
+
+    :param sedes: an object implementing a function ``serialize(obj)`` which will be used to
+                  serialize ``obj`` before encoding, or ``None`` to use the infered one
+    :param chunk_size: the size in bytes after which a chunk is completed. Chunks can be larger
+                       if a single piece of the encoding (e.g. a long string) is larger.
+    :param vectors: if true, chunks are lists of buffers referencing the payloads and cached
+                    encodings instead of byte strings, usable as vectors for scatter/gather I/O
+                    such as :meth:`socket.socket.sendmsg` without copying
+    :returns: a generator yielding the chunks of the encoding
+    :raises: :exc:`rlp.EncodingError` if the object can't be encoded
+    :raises: :exc:`rlp.SerializationError` if the serialization fails
+    """
+    if sedes is None:
+        sedes = _encoding_sedes(obj)
+
+    pending = []
+    pending_length = 0
+    for segments in _iter_segments(obj, sedes):
+        for segment in segments:
+            if not segment:
+                continue
+            pending.append(segment)
+            pending_length += len(segment)
+            if pending_length >= chunk_size or (vectors and len(pending) >= MAX_VECTOR_LENGTH):
+                yield pending if vectors else b''.join(pending)
+                pending = []
+                pending_length = 0
+    if pending:
+        yield pending if vectors else b''.join(pending)
+
+
+def _encoding_sedes(obj):
+    """Get the sedes :func:`rlp.iterencode` uses for `obj` if none is given."""
+    if isinstance(obj, Serializable) and obj._cached_rlp_length():
+        return obj.__class__
+    else:
+        return _infer_encoding_sedes(obj)
+
+
+def encode_to_stream(obj, fileobj, sedes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encode a Python object in RLP format and write the result to a file-like object.
+
+    The encoding is produced chunk by chunk by :func:`rlp.iterencode`, so large countable lists
+    are written without materializing their encoding.
+
+    :param fileobj: a file-like object opened for writing in binary mode
+    :param sedes: an object implementing a function ``serialize(obj)`` which will be used to
+                  serialize ``obj`` before encoding, or ``None`` to use the infered one
+    :returns: the number of bytes written
+    """
+    written = 0
+    for chunk in iterencode(obj, sedes, chunk_size=chunk_size):
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def iter_decode(fileobj, sedes=None, buffer_size=DEFAULT_CHUNK_SIZE, limits=None, **kwargs):
+    r"""Decode RLP encoded items stored back to back in a file or received from a socket.
+
+    Each item is read and decoded as soon as its bytes are complete. The header of an item is read
+    first, then exactly as many bytes as it announces, so no data following the item is consumed
+    before the item is yielded.
+
+    :param fileobj: a file-like object opened for reading in binary mode, or a socket
+    :param sedes: an object implementing a function ``deserialize(code)`` which will be applied
+                  to each item, or ``None`` if no deserialization should be performed
+    :param buffer_size: the maximum number of bytes requested per read. Large items are read in
+                        pieces of this size, so that memory is only allocated for data that
+                        actually arrives.
+    :param limits: a :class:`rlp.DecodeLimits` object restricting each item, or ``None``. The
+                   size of an item and, for strings, its length are checked before it is read.
+    :param \*\*kwargs: additional keyword arguments that will be passed to :func:`rlp.decode`
+    :returns: a generator yielding the decoded and maybe deserialized items
+    :raises: :exc:`rlp.DecodingError` if an item is invalid or the stream ends in the middle of it
+    :raises: :exc:`rlp.DeserializationError` if the deserialization fails
+    """
+    read = getattr(fileobj, 'read', None) or fileobj.recv
+    while True:
+        first_byte = read(1)
+        if not first_byte:
+            return
+        chunks = [first_byte]
+        _read_exactly(read, _header_length(first_byte[0]) - 1, buffer_size, chunks)
+        header = b''.join(chunks)
+        item_length = _item_length(header)
+        if limits is not None:
+            Budget(limits).check_header(header, item_length)
+        _read_exactly(read, item_length - len(header), buffer_size, chunks)
+        yield decode(b''.join(chunks), sedes, limits=limits, **kwargs)
+
+
+def _read_exactly(read, size, buffer_size, chunks):
+    """Read `size` bytes, appending the pieces to a list of chunks."""
+    while size > 0:
+        chunk = read(min(size, buffer_size))
+        if not chunk:
+            raise DecodingError('Stream ended in the middle of an item', b''.join(chunks))
+        chunks.append(chunk)
+        size -= len(chunk)
+
+
+class ListWriter(object):
+    """Write an RLP list whose elements are not known in advance to a seekable file.
+
+    Space for the length prefix is reserved when the writer is opened, the elements are encoded
+    and written one by one as they are appended, and the prefix is filled in when the writer is
+    closed. The writer can be used as a context manager, which opens it on entry and closes it on
+    exit, unless an exception occurred::
+
+        >>> import io, rlp
+        >>> f = io.BytesIO()
+        >>> with rlp.ListWriter(f) as writer:
+        ...     writer.extend([b'cat', b'dog'])
+        8
+        >>> f.getvalue() == rlp.encode([b'cat', b'dog'])
+        True
+
+    If the size of the final prefix differs from the reserved size, the written elements are moved
+    in the file, which requires it to be readable and costs a pass over the data. This can be
+    avoided by passing an estimate of the final payload length as `max_payload_length`, as the
+    prefix only depends on the number of bytes needed to express the length. Without it, files
+    opened for writing only are rejected. On such files, elements that would make the payload
+    outgrow the reserved prefix are rejected before they are written, and closing fails if the
+    payload is too short for it.
+
+    The list is meant to be written at the end of the file: if the elements have to be moved, the
+    file is truncated after the list only if it ended with the list, and data following the list
+    is overwritten if the prefix turns out to be longer than the reserved one.
+
+    :param fileobj: a seekable file-like object opened for writing in binary mode
+    :param sedes: a sedes object used to serialize all elements, or ``None`` to infer it for
+                  each element
+    :param max_payload_length: an estimate of the total length of the encoded elements, or
+                               ``None`` to reserve space for the longest possible prefix
+    """
+
+    def __init__(self, fileobj, sedes=None, max_payload_length=None):
+        self.fileobj = fileobj
+        self.sedes = sedes
+        self.max_payload_length = max_payload_length
+        self.start = None
+        self.payload_length = 0
+        self.closed = False
+        self._parent = None
+        self._open_child = None
+
+    def open(self):
+        """Reserve space for the length prefix at the current position of the file.
+
+        :raises: :exc:`ValueError` if no `max_payload_length` is given and the file is not
+                 readable, so that the elements couldn't be moved when the writer is closed
+        :raises: :exc:`rlp.EncodingError` if the file is not readable and the reserved space
+                 doesn't fit into the prefix of the enclosing list
+        """
+        if self.start is not None:
+            raise ValueError('ListWriter has already been opened')
+        readable = getattr(self.fileobj, 'readable', None)
+        self._movable = readable is None or readable()
+        if self.max_payload_length is None:
+            if not self._movable:
+                raise ValueError(
+                    'ListWriter requires a readable file if max_payload_length is not given'
+                )
+            self._reserved = length_prefix_size(LONG_LENGTH - 1)
+        else:
+            self._reserved = length_prefix_size(self.max_payload_length)
+        if not self._movable and self._parent is not None:
+            self._parent._check_capacity(self._reserved)
+        self.start = self.fileobj.tell()
+        self.fileobj.write(b'\x00' * self._reserved)
+
+    def append(self, obj, sedes=None):
+        """Encode an element and append it to the list.
+
+        :param sedes: the sedes used to serialize `obj`, or ``None`` to use the sedes of the
+                      writer (if any) or to infer it
+        :returns: the number of bytes written
+        :raises: :exc:`rlp.EncodingError` if the file is not readable and the element doesn't fit
+                 into the payload length the prefix has been reserved for
+        """
+        self._check_writable()
+        sedes = sedes or self.sedes
+        if not self._movable:
+            if sedes is None:
+                sedes = _encoding_sedes(obj)
+            self._check_capacity(_measure(obj, sedes))
+        written = encode_to_stream(obj, self.fileobj, sedes)
+        self.payload_length += written
+        return written
+
+    def extend(self, objs, sedes=None):
+        """Encode and append each element of an iterable to the list.
+
+        :returns: the number of bytes written
+        """
+        return sum(self.append(obj, sedes) for obj in objs)
+
+    def list(self, sedes=None, max_payload_length=None):
+        """Open a nested list that is appended to this list as a single element.
+
+        No elements can be appended to this list until the nested list is closed.
+
+        :returns: an opened :class:`rlp.ListWriter` for the nested list
+        """
+        self._check_writable()
+        child = ListWriter(self.fileobj, sedes, max_payload_length)
+        child._parent = self
+        child.open()
+        self._open_child = child
+        return child
+
+    def close(self):
+        """Fill in the length prefix.
+
+        :returns: the total length of the encoded list in bytes
+        :raises: :exc:`rlp.EncodingError` if the file is not readable and the payload is too
+                 short for the reserved prefix
+        """
+        self._check_writable()
+        try:
+            prefix = length_prefix(self.payload_length, 192)
+        except ValueError:
+            raise EncodingError('Item too big to encode', None)
+
+        payload_start = self.start + self._reserved
+        end = payload_start + self.payload_length
+        if len(prefix) != self._reserved:
+            if not self._movable:
+                raise EncodingError(
+                    'List payload of {} bytes is too short for the prefix reserved for {} bytes '
+                    'on a file that is not readable'.format(
+                        self.payload_length, self.max_payload_length,
+                    ),
+                    None,
+                )
+            self.fileobj.seek(0, io.SEEK_END)
+            at_end = self.fileobj.tell() == end
+            new_payload_start = self.start + len(prefix)
+            _move(self.fileobj, payload_start, new_payload_start, self.payload_length)
+            end = new_payload_start + self.payload_length
+            if at_end:
+                self.fileobj.truncate(end)
+        self.fileobj.seek(self.start)
+        self.fileobj.write(prefix)
+        self.fileobj.seek(end)
+
+        self.closed = True
+        total_length = len(prefix) + self.payload_length
+        if self._parent is not None:
+            self._parent._open_child = None
+            self._parent.payload_length += total_length
+        return total_length
+
+    def _check_capacity(self, length):
+        """Check that `length` more payload bytes fit into the reserved prefixes.
+
+        The enclosing lists are checked as well, as the elements count towards their payloads.
+        """
+        writer = self
+        while writer is not None:
+            if length_prefix_size(writer.payload_length + length) > writer._reserved:
+                raise EncodingError(
+                    'List payload exceeds the max_payload_length of {} on a file that is not '
+                    'readable'.format(writer.max_payload_length),
+                    None,
+                )
+            # the prefix of a list on such a file keeps its reserved size
+            length += writer._reserved + writer.payload_length
+            writer = writer._parent
+
+    def _check_writable(self):
+        if self.start is None:
+            raise ValueError('ListWriter has not been opened')
+        elif self.closed:
+            raise ValueError('ListWriter has already been closed')
+        elif self._open_child is not None:
+            raise ValueError('ListWriter has an open nested list')
+
+    def __enter__(self):
+        if self.start is None:
+            self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+def _move(fileobj, source, destination, length, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Move `length` bytes within a file from `source` to `destination` in bounded chunks."""
+    if destination < source:
+        offsets = range(0, length, chunk_size)
+    else:
+        offsets = reversed(range(0, length, chunk_size))
+    for offset in offsets:
+        size = min(chunk_size, length - offset)
+        fileobj.seek(source + offset)
+        chunk = fileobj.read(size)
+        if len(chunk) != size:
+            raise IOError('Unexpected end of file while moving list elements')
+        fileobj.seek(destination + offset)
+        fileobj.write(chunk)
+
+
+def _iter_segments(obj, sedes):
+    """Yield lists of segments encoding `obj`, one list per element of countable lists."""
+    if not isinstance(sedes, CountableList) or not encodes_segments(sedes):
+        segments = []
+        append_serialized_segments(obj, sedes, segments)
+        yield segments
+        return
+
+    payload_length = _measure_payload(obj, sedes)
+    try:
+        prefix = length_prefix(payload_length, 192)
+    except ValueError:
+        raise EncodingError('Item too big to encode', obj)
+    yield [prefix]
+    for element in _iter_elements(obj):
+        yield from _iter_segments(element, sedes.element_sedes)
+
+
+def _measure(obj, sedes):
+    if isinstance(sedes, CountableList) and encodes_segments(sedes):
+        return list_encoded_length(_measure_payload(obj, sedes), obj)
+    else:
+        return serialized_encoded_length(obj, sedes)
+
+
+def _measure_payload(obj, sedes):
+    """Compute the payload length of a countable list, validating the elements on the way."""
+    payload_length = 0
+    for index, element in enumerate(_iter_elements(obj)):
+        if sedes.max_length is not None and index >= sedes.max_length:
+            raise ListSerializationError(
+                'Too many elements (more than {})'.format(sedes.max_length),
+                obj=obj,
+            )
+        try:
+            payload_length += _measure(element, sedes.element_sedes)
+        except SerializationError as e:
+            raise ListSerializationError(obj=obj, element_exception=e, index=index)
+    return payload_length
+
+
+def _iter_elements(obj):
+    if is_sequence(obj):
+        return obj
+    elif isinstance(obj, Iterator):
+        raise TypeError(
+            'Cannot stream the elements of a one-shot iterator, as they have to be iterated '
+            'over twice: once to compute the length of the list and once to encode them'
+        )
+    elif isinstance(obj, Iterable) and not isinstance(obj, str) and \
+            not BinaryClass.is_valid_type(obj):
+        return obj
+    else:
+        raise ListSerializationError('Can only serialize sequences', obj)
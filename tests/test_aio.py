@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from rlp import DecodingError, Serializable, encode
+from rlp.aio import ItemReader, read_item
+from rlp.sedes import big_endian_int, binary
+
+
+class Account(Serializable):
+    fields = [
+        ('nonce', big_endian_int),
+        ('code', binary),
+    ]
+
+
+ITEMS = [b'', b'\x00', b'dog', b'x' * 56, b'x' * 1000, [], [b'cat', [b'dog', b'']]]
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def make_reader(data, eof=True):
+    reader = asyncio.StreamReader(loop=asyncio.get_event_loop())
+    reader.feed_data(data)
+    if eof:
+        reader.feed_eof()
+    return reader
+
+
+async def collect(iterator):
+    items = []
+    async for item in iterator:
+        items.append(item)
+    return items
+
+
+def test_read_item():
+    reader = make_reader(b''.join(encode(item) for item in ITEMS))
+    for item in ITEMS:
+        assert run(read_item(reader)) == item
+    with pytest.raises(asyncio.IncompleteReadError):
+        run(read_item(reader))
+
+
+def test_read_item_does_not_over_read():
+    reader = make_reader(encode(b'dog') + b'\xc5', eof=False)
+    assert run(read_item(reader)) == b'dog'
+    assert reader._buffer == b'\xc5'
+
+
+def test_read_item_with_sedes():
+    account = Account(1, b'code')
+    reader = make_reader(encode(account))
+    decoded = run(read_item(reader, Account))
+    assert decoded == account
+    assert decoded._cached_rlp == encode(account)
+
+
+def test_read_item_max_size():
+    rlp = encode(b'x' * 100)
+    assert run(read_item(make_reader(rlp), max_size=len(rlp))) == b'x' * 100
+    assert run(read_item(make_reader(rlp), max_size=None)) == b'x' * 100
+    # the payload is not read if the header announces a too large item
+    reader = make_reader(rlp)
+    with pytest.raises(DecodingError):
+        run(read_item(reader, max_size=len(rlp) - 1))
+    assert len(reader._buffer) == 100
+
+
+@pytest.mark.parametrize('rlp', (b'\x83do', b'\xb8', b'\xc3\x83dog', b'\xb9\x00\x40'))
+def test_read_item_invalid(rlp):
+    with pytest.raises(DecodingError):
+        run(read_item(make_reader(rlp)))
+
+
+def test_item_reader():
+    reader = make_reader(b''.join(encode(item) for item in ITEMS))
+    assert run(collect(ItemReader(reader))) == ITEMS
+    assert run(collect(ItemReader(make_reader(b'')))) == []
+
+    accounts = [Account(nonce, b'code') for nonce in range(3)]
+    reader = make_reader(b''.join(encode(account) for account in accounts))
+    assert run(collect(ItemReader(reader, Account))) == accounts
+
+
+def test_item_reader_fails_on_incomplete_item():
+    reader = make_reader(encode(b'dog') + encode(b'cat')[:-1])
+    with pytest.raises(DecodingError):
+        run(collect(ItemReader(reader)))
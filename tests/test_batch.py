@@ -0,0 +1,139 @@
+import pytest
+
+from rlp import (
+    DecodingError,
+    DeserializationError,
+    Serializable,
+    SerializationError,
+    decode,
+    decode_many,
+    decode_sequence,
+    encode,
+    encode_many,
+)
+from rlp.sedes import CountableList, big_endian_int, binary
+
+
+class Transaction(Serializable):
+    fields = [
+        ('nonce', big_endian_int),
+        ('data', binary),
+    ]
+
+
+heterogeneous = [0, b'dog', [], [1, [b'cat']], 'text', True, Transaction(1, b'x')]
+
+
+def test_encode_many():
+    assert encode_many(heterogeneous) == [encode(obj) for obj in heterogeneous]
+    assert encode_many([]) == []
+
+
+def test_encode_many_with_sedes():
+    sedes = CountableList(big_endian_int)
+    values = [[], [1], [1, 2, 3]]
+    assert encode_many(values, sedes) == [encode(value, sedes) for value in values]
+    with pytest.raises(SerializationError):
+        encode_many([[1], [b'x']], sedes)
+
+
+def test_encode_many_raw():
+    values = [b'', [b'a', [b'b']]]
+    expected = [encode(value, infer_serializer=False) for value in values]
+    assert encode_many(values, infer_serializer=False) == expected
+
+
+def test_encode_many_concatenated():
+    rlp, offsets = encode_many(heterogeneous, concatenate=True)
+    encodings = [encode(obj) for obj in heterogeneous]
+    assert rlp == b''.join(encodings)
+    assert len(offsets) == len(heterogeneous) + 1
+    for index, encoding in enumerate(encodings):
+        assert rlp[offsets[index]:offsets[index + 1]] == encoding
+
+    rlp, offsets = encode_many([], concatenate=True)
+    assert rlp == b''
+    assert list(offsets) == [0]
+
+
+def test_encode_many_caching():
+    transactions = [Transaction(index, b'') for index in range(3)]
+    encodings = encode_many(transactions)
+    assert [tx._cached_rlp for tx in transactions] == encodings
+
+    transactions[0]._cached_rlp = b'test-uses-cache'
+    assert encode_many(transactions)[0] == b'test-uses-cache'
+
+    uncached = [Transaction(index, b'') for index in range(3)]
+    encode_many(uncached, cache=False)
+    encode_many(uncached, concatenate=True)
+    assert all(tx._cached_rlp is None for tx in uncached)
+
+
+def test_decode_many():
+    encodings = [encode(obj) for obj in heterogeneous]
+    assert decode_many(encodings) == [decode(encoding) for encoding in encodings]
+
+    transactions = [Transaction(index, b'x' * index) for index in range(3)]
+    encodings = encode_many(transactions, cache=False)
+    decoded = decode_many(encodings, Transaction)
+    assert decoded == transactions
+    assert [tx._cached_rlp for tx in decoded] == encodings
+
+
+def test_decode_many_with_offsets():
+    transactions = [Transaction(index, b'x' * index) for index in range(3)]
+    rlp, offsets = encode_many(transactions, concatenate=True)
+    decoded = decode_many(rlp, Transaction, offsets=offsets)
+    assert decoded == transactions
+    assert [tx._cached_rlp for tx in decoded] == encode_many(transactions, cache=False)
+
+    # item ends after the given boundary
+    with pytest.raises(DecodingError):
+        decode_many(rlp, Transaction, offsets=[0, offsets[1] - 1])
+    # item ends before the given boundary
+    with pytest.raises(DecodingError):
+        decode_many(rlp, Transaction, offsets=[0, offsets[2]])
+    assert decode_many(rlp, Transaction, strict=False, offsets=[0, offsets[2]]) == [
+        transactions[0],
+    ]
+
+
+def test_decode_many_errors():
+    with pytest.raises(DecodingError):
+        decode_many([b'\x83dog', b'\x83do'])
+    with pytest.raises(DecodingError):
+        decode_many([b'\x83dog', 'dog'])
+    with pytest.raises(DeserializationError):
+        decode_many([encode([1, b'']), encode([1])], Transaction)
+
+
+def test_decode_sequence():
+    objs = [b'', b'dog', [], [b'\x01', [b'cat']], b'x' * 100]
+    rlp = b''.join(encode(obj) for obj in objs)
+    assert decode_sequence(rlp) == objs
+    assert decode_sequence(b'') == []
+
+    decoded, offsets = decode_sequence(rlp, return_offsets=True)
+    assert decoded == objs
+    assert list(offsets) == [0, 1, 5, 6, 13, 115]
+    assert decode_many(rlp, offsets=offsets) == objs
+
+
+def test_decode_sequence_with_sedes():
+    transactions = [Transaction(nonce, b'x' * nonce) for nonce in range(60)]
+    rlp, offsets = encode_many(transactions, concatenate=True)
+    decoded, decoded_offsets = decode_sequence(rlp, Transaction, return_offsets=True)
+    assert decoded == transactions
+    assert decoded_offsets == offsets
+    assert [tx._cached_rlp for tx in decoded] == [encode(tx) for tx in transactions]
+
+
+def test_decode_sequence_errors():
+    rlp = encode(b'dog') + encode([b'cat'])
+    with pytest.raises(DecodingError):
+        decode_sequence(rlp[:-1])
+    with pytest.raises(DecodingError):
+        decode_sequence(rlp + b'\x81\x01')
+    with pytest.raises(DeserializationError):
+        decode_sequence(rlp, binary)
@@ -1,9 +1,17 @@
 # -*- coding: utf8 -*-
+from array import array
+
+import pytest
+
 from rlp import (
+    SerializationError,
     encode,
+    encoded_length,
     decode,
     decode_lazy,
 )
+from rlp.codec import encode_raw
+from rlp.sedes import Binary, binary
 
 
 def test_bytearray():
@@ -26,3 +34,19 @@ def test_encoding_bytearray():
     from_bytearray = encode(bytearray(s))
     assert direct == from_bytearray
     assert decode(direct) == s
+
+
+def test_encoding_memoryview_of_any_format():
+    ints = array('I', [1, 2])
+    expected = encode(ints.tobytes())
+    assert encode(memoryview(ints)) == expected
+    assert encode(memoryview(ints), binary) == expected
+    assert encode([memoryview(ints)]) == encode([ints.tobytes()])
+    assert encode_raw(memoryview(ints)) == expected
+    assert encoded_length(memoryview(ints)) == len(expected)
+    assert decode(encode(memoryview(ints))) == ints.tobytes()
+    # signed bytes and non-contiguous views
+    assert encode(memoryview(array('b', [-1]))) == encode(b'\xff')
+    assert encode(memoryview(b'abcdef')[::2]) == encode(b'ace')
+    with pytest.raises(SerializationError):
+        encode(memoryview(ints), Binary.fixed_length(2))
@@ -1,14 +1,36 @@
+import sys
+
 import pytest
 
 from eth_utils import (
     decode_hex,
 )
 
-from rlp.exceptions import DecodingError
-from rlp.codec import consume_length_prefix, consume_item
+from rlp.exceptions import DecodingError, EncodingError, SerializationError
+from rlp.codec import (
+    consume_length_prefix,
+    consume_item,
+    encode_raw,
+    length_prefix,
+    raw_encoded_length,
+)
+from rlp.sedes import (
+    BigEndianInt,
+    Boolean,
+    CountableList,
+    List,
+    big_endian_int,
+    binary,
+    boolean,
+    text,
+)
 from rlp import (
+    Decoder,
     decode,
+    decode_many,
     encode,
+    encoded_length,
+    infer_sedes,
 )
 
 
@@ -68,3 +90,171 @@ def test_consume_item():
     ]
     assert end == 123
     assert per_item_rlp[0] == rlp
+
+
+@pytest.mark.parametrize('rlp', (
+    # list prefix announces 2 bytes, but the nested string is 3 bytes long
+    b'\xc2\x82ab',
+    # string payload exceeds the input
+    b'\xc3\x82a',
+))
+@pytest.mark.parametrize('recursive_cache', (False, True))
+def test_decode_rejects_overlong_items(rlp, recursive_cache):
+    with pytest.raises(DecodingError):
+        decode(rlp, recursive_cache=recursive_cache)
+    with pytest.raises(DecodingError):
+        decode(rlp, strict=False, recursive_cache=recursive_cache)
+
+
+def test_encode_raw_matches_recursive_concatenation():
+    def reference_encode(item):
+        if isinstance(item, bytes):
+            if len(item) == 1 and item[0] < 128:
+                return item
+            return length_prefix(len(item), 0x80) + item
+        payload = b''.join(reference_encode(x) for x in item)
+        return length_prefix(len(payload), 0xc0) + payload
+
+    wide = [[b'\x01', b'tx' * 40, [b'', b'\x80']] for _ in range(1000)]
+    deep = [b'leaf']
+    for _ in range(100):
+        deep = [deep, b'x' * 60]
+    for item in (b'', b'\x7f', b'\x80', wide, deep, [[], [[]], [[], [[]]]]):
+        assert encode_raw(item) == reference_encode(item)
+
+
+@pytest.mark.parametrize(
+    'obj',
+    (
+        b'',
+        b'\x00',
+        b'\x7f',
+        b'\x80',
+        b'a' * 55,
+        b'a' * 56,
+        b'a' * 1024,
+        0,
+        127,
+        128,
+        2**256,
+        [],
+        [[]] * 55,
+        [b'a' * 54],
+        [b'a' * 55],
+        [[b'dog', 1], [b'x' * 300, [[]]]],
+        'text',
+    ),
+)
+def test_encoded_length(obj):
+    assert encoded_length(obj) == len(encode(obj))
+    assert raw_encoded_length(infer_sedes(obj).serialize(obj)) == len(encode(obj))
+
+
+def test_encoded_length_with_sedes():
+    sedes = CountableList(big_endian_int)
+    assert encoded_length([1, 2, 1024], sedes) == len(encode([1, 2, 1024], sedes))
+    with pytest.raises(SerializationError):
+        encoded_length([1, b'x'], sedes)
+
+
+@pytest.mark.parametrize(
+    'obj, sedes',
+    (
+        (0, big_endian_int),
+        (1, big_endian_int),
+        (127, big_endian_int),
+        (128, big_endian_int),
+        (2**448 - 1, big_endian_int),
+        (2**448, big_endian_int),
+        (0, BigEndianInt(1)),
+        (127, BigEndianInt(1)),
+        (128, BigEndianInt(1)),
+        (5, BigEndianInt(32)),
+        (True, boolean),
+        (False, boolean),
+        ('\u20ac' * 20, text),
+        (memoryview(b'a' * 60), binary),
+        ([1, b'a', [True]], List((big_endian_int, binary, List((boolean,))))),
+    ),
+)
+def test_encoded_length_without_serializing(obj, sedes, monkeypatch):
+    expected = len(encode(obj, sedes))
+    for cls in (BigEndianInt, Boolean):
+        monkeypatch.setattr(cls, 'serialize', None)
+    assert encoded_length(obj, sedes) == expected
+
+
+def test_encoded_length_validates_objects():
+    with pytest.raises(SerializationError):
+        encoded_length(-1, big_endian_int)
+    with pytest.raises(SerializationError):
+        encoded_length(256, BigEndianInt(1))
+    with pytest.raises(SerializationError):
+        encoded_length(1, boolean)
+    with pytest.raises(SerializationError):
+        encoded_length([1, 2], List((big_endian_int,)))
+
+
+def test_encoded_length_of_invalid_raw_item():
+    with pytest.raises(EncodingError):
+        raw_encoded_length([b'a', 5])
+
+
+def nested_list(depth):
+    item = b''
+    for _ in range(depth):
+        item = [item]
+    return item
+
+
+def test_deeply_nested_items():
+    depth = 10 * sys.getrecursionlimit()
+    rlp = encode_raw(nested_list(depth))
+    item = decode(rlp)
+    for _ in range(depth):
+        assert len(item) == 1
+        item = item[0]
+    assert item == b''
+    assert decode(rlp, recursive_cache=True, max_depth=depth) is not None
+    assert encode(nested_list(depth), infer_serializer=False) == rlp
+    assert encoded_length(nested_list(depth), infer_serializer=False) == len(rlp)
+
+
+@pytest.mark.parametrize('depth', (0, 1, 2, 5))
+def test_max_depth(depth):
+    item = nested_list(depth)
+    rlp = encode_raw(item, max_depth=depth)
+    assert decode(rlp, max_depth=depth) == item
+    assert decode_many([rlp], max_depth=depth) == [item]
+    assert Decoder(max_depth=depth).decode(rlp) == item
+
+    if depth > 0:
+        with pytest.raises(EncodingError):
+            encode_raw(item, max_depth=depth - 1)
+        with pytest.raises(DecodingError):
+            decode(rlp, max_depth=depth - 1)
+        with pytest.raises(DecodingError):
+            decode(rlp, max_depth=depth - 1, recursive_cache=True)
+        with pytest.raises(DecodingError):
+            decode_many([rlp], max_depth=depth - 1)
+        with pytest.raises(DecodingError):
+            Decoder(max_depth=depth - 1).decode(rlp)
+
+
+def test_max_depth_counts_nesting_not_lists():
+    item = [[b'a', [b'b']], [[b'c'], b'd'], []]
+    assert decode(encode_raw(item, max_depth=3), max_depth=3) == item
+    with pytest.raises(DecodingError):
+        decode(encode(item), max_depth=2)
+
+
+def test_decoder_reuse():
+    decoder = Decoder(max_depth=3)
+    obj = [b'a', [b'b', [b'c']], b'd']
+    assert decoder.decode(encode(obj)) == obj
+    for invalid in (b'\xc4\xc3\xc2\xc1\xc0', b'\xc4\xc1\x83dog', b'\xc3\xc2\x83dog'):
+        with pytest.raises(DecodingError):
+            decoder.decode(invalid)
+        assert decoder._stack == []
+    assert decoder.decode(encode(obj)) == obj
+    assert decoder.decode(encode([1, 2]), CountableList(big_endian_int)) == (1, 2)
@@ -0,0 +1,102 @@
+import mmap
+
+import pytest
+
+from rlp import (
+    EncodingError,
+    SerializationError,
+    Serializable,
+    encode,
+    encode_into,
+)
+from rlp.sedes import CountableList, List, big_endian_int, binary
+
+
+class RLPType1(Serializable):
+    fields = [
+        ('field1', big_endian_int),
+        ('field2', binary),
+        ('field3', List((big_endian_int, binary)))
+    ]
+
+
+@pytest.mark.parametrize(
+    'obj',
+    (
+        b'',
+        b'\x01',
+        b'dog',
+        1024,
+        [],
+        [b'cat', [b'dog', [b'\x00' * 100]], 255],
+        RLPType1(5, b'a', (0, b'')),
+    ),
+)
+def test_encode_into_bytearray(obj):
+    expected = encode(obj)
+    buffer = bytearray(b'\xff' * (len(expected) + 10))
+    assert encode_into(obj, buffer, 4) == len(expected)
+    assert buffer[:4] == b'\xff' * 4
+    assert buffer[4:4 + len(expected)] == expected
+    assert buffer[4 + len(expected):] == b'\xff' * 6
+
+
+def test_encode_into_memoryview_and_mmap():
+    obj = [1, 2, 3, b'x' * 60]
+    expected = encode(obj)
+
+    backing = bytearray(len(expected) * 2)
+    view = memoryview(backing)[len(expected):]
+    assert encode_into(obj, view) == len(expected)
+    assert backing[len(expected):] == expected
+
+    with mmap.mmap(-1, len(expected)) as mapped:
+        assert encode_into(obj, mapped) == len(expected)
+        assert mapped[:] == expected
+
+
+def test_encode_into_with_sedes():
+    buffer = bytearray(100)
+    sedes = CountableList(big_endian_int)
+    length = encode_into([1, 2, 3], buffer, sedes=sedes)
+    assert bytes(buffer[:length]) == encode([1, 2, 3], sedes)
+    with pytest.raises(SerializationError):
+        encode_into([1, b'x'], buffer, sedes=sedes)
+
+
+def test_encode_into_uses_cache():
+    obj = RLPType1(5, b'a', (0, b''))
+    obj._cached_rlp = b'\xc1\x80'
+    buffer = bytearray(2)
+    assert encode_into(obj, buffer) == 2
+    assert buffer == b'\xc1\x80'
+
+
+def test_encode_into_too_small_buffer():
+    obj = [b'cat', b'dog']
+    buffer = bytearray(len(encode(obj)) - 1)
+    with pytest.raises(EncodingError):
+        encode_into(obj, buffer)
+    assert buffer == bytearray(len(buffer))
+
+    buffer = bytearray(len(encode(obj)) + 1)
+    with pytest.raises(EncodingError):
+        encode_into(obj, buffer, 2)
+    assert buffer == bytearray(len(buffer))
+
+
+def test_encode_into_read_only_buffer():
+    with pytest.raises(TypeError):
+        encode_into(b'dog', b'\x00' * 10)
+
+
+def test_encode_into_releases_buffer_on_failure():
+    obj = [b'cat', b'dog']
+    mapped = mmap.mmap(-1, len(encode(obj)) - 1)
+    with pytest.raises(EncodingError) as excinfo:
+        encode_into(obj, mapped)
+    with pytest.raises(SerializationError):
+        encode_into([1, b'x'], mapped, sedes=CountableList(big_endian_int))
+    # the traceback of the exception must not keep the buffer exported
+    assert excinfo.traceback
+    mapped.close()
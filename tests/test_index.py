@@ -0,0 +1,137 @@
+import pytest
+
+from rlp import (
+    DecodingError,
+    RLPIndex,
+    Serializable,
+    decode,
+    encode,
+    peek,
+)
+from rlp.sedes import CountableList, big_endian_int, binary
+
+
+class Transaction(Serializable):
+    fields = [
+        ('nonce', big_endian_int),
+        ('data', binary),
+    ]
+
+
+class Block(Serializable):
+    fields = [
+        ('number', big_endian_int),
+        ('transactions', CountableList(Transaction)),
+    ]
+
+
+OBJS = [
+    b'',
+    b'dog',
+    b'x' * 1000,
+    [],
+    [[]],
+    [b'cat', [b'dog', b'cow'], [], b'y' * 100],
+    [[b'a', [b'b', [b'c', [b'd']]]], [b'e'] * 100, [[b'f'] * 3] * 30],
+]
+
+
+@pytest.mark.parametrize('obj', OBJS)
+def test_index_item(obj):
+    index = RLPIndex(encode(obj))
+    assert index.item() == obj
+    assert index.decode() == obj
+    assert index.encoding(0) == encode(obj)
+    assert index.next_sibling(0) == len(index)
+
+
+def walk(obj, path=()):
+    yield path, obj
+    if isinstance(obj, list):
+        for i, element in enumerate(obj):
+            yield from walk(element, path + (i,))
+
+
+@pytest.mark.parametrize('obj', OBJS)
+def test_index_random_access(obj):
+    rlp = encode(obj)
+    index = RLPIndex(rlp)
+    for path, element in walk(obj):
+        record = index.find(path)
+        assert index.item(record) == element
+        assert index.encoding(record) == encode(element)
+        assert index.is_list(record) == isinstance(element, list)
+        if isinstance(element, list):
+            assert index.length(record) == len(element)
+            assert [index.item(child) for child in index.children(record)] == element
+            for i in range(-len(element), 0):
+                assert index.item(index.child(record, i)) == element[i]
+        else:
+            assert index.payload(record) == element
+            with pytest.raises(TypeError):
+                index.length(record)
+        if path and not isinstance(element, list):
+            assert index.decode(path) == peek(rlp, path)
+
+
+def test_index_next_sibling():
+    index = RLPIndex(encode([[b'a', [b'b']], b'c', [[], b'd']]))
+    first, second, third = index.children(0)
+    assert index.next_sibling(first) == second
+    assert index.next_sibling(second) == third
+    assert index.next_sibling(third) == len(index)
+
+
+def test_index_invalid_paths():
+    index = RLPIndex(encode([b'cat', [b'dog']]))
+    for path in (2, -3, [1, 1], [0, 0], [1, 0, 0]):
+        with pytest.raises(IndexError):
+            index.find(path)
+    with pytest.raises(IndexError):
+        index.item(len(index))
+
+
+def test_index_decode_with_sedes():
+    block = Block(1, [Transaction(nonce, b'data' * nonce) for nonce in range(10)])
+    index = RLPIndex(encode(block))
+    transaction = index.decode([1, 7], Transaction)
+    assert transaction == block.transactions[7]
+    assert transaction._cached_rlp == encode(block.transactions[7])
+    assert index.decode([0], big_endian_int) == 1
+    assert index.decode(sedes=Block) == block
+
+
+def test_index_zero_copy():
+    rlp = bytearray(encode([b'cat', [b'dog']]))
+    index = RLPIndex(rlp, zero_copy=True)
+    assert isinstance(index.item(index.find([1, 0])), memoryview)
+    assert index.item() == [b'cat', [b'dog']]
+
+
+@pytest.mark.parametrize('rlp', (
+    b'',
+    b'\x83do',
+    b'\xc3\x83dog',
+    b'\xc5\x83dog',
+    b'\x81\x01',
+    b'\xb8\x05abcde',
+    b'\xc0\x80',
+))
+def test_index_invalid(rlp):
+    with pytest.raises(DecodingError):
+        decode(rlp)
+    with pytest.raises(DecodingError):
+        RLPIndex(rlp)
+
+
+def test_index_non_strict():
+    index = RLPIndex(encode([b'cat']) + b'\x80', strict=False)
+    assert index.item() == [b'cat']
+    assert index.end == 5
+
+
+def test_index_max_depth():
+    rlp = encode([[[]]])
+    assert RLPIndex(rlp, max_depth=3).item() == [[[]]]
+    with pytest.raises(DecodingError):
+        RLPIndex(rlp, max_depth=2)
@@ -0,0 +1,151 @@
+import pytest
+
+from rlp import (
+    DecodingError,
+    InternTable,
+    Serializable,
+    decode,
+    decode_many,
+    encode,
+)
+from rlp.sedes import Binary, CountableList, big_endian_int, binary
+
+
+address = Binary.fixed_length(20)
+hash32 = Binary.fixed_length(32)
+
+
+class Log(Serializable):
+    fields = [
+        ('address', address),
+        ('topics', CountableList(hash32)),
+        ('data', binary),
+    ]
+
+
+class Receipt(Serializable):
+    fields = [
+        ('status', big_endian_int),
+        ('gas_used', big_endian_int),
+        ('logs', CountableList(Log)),
+    ]
+
+
+TOKEN = b'\x11' * 20
+TRANSFER = b'\x22' * 32
+
+
+def make_receipt(index):
+    logs = [
+        Log(TOKEN, [TRANSFER, index.to_bytes(32, 'big')], b''),
+        Log(TOKEN, [TRANSFER], b''),
+    ]
+    return Receipt(1, 21000 + index, logs)
+
+
+def test_intern_strings():
+    rlp_code = encode([TOKEN, [TOKEN, b'ab', b'ab'], TOKEN])
+    decoded = decode(rlp_code, intern=True)
+    assert decoded == decode(rlp_code)
+    assert decoded[0] is decoded[1][0] is decoded[2]
+    # strings shorter than the minimum length are left alone
+    assert decoded[1][1] is not decoded[1][2]
+
+
+def test_intern_table_shared_between_calls():
+    table = InternTable()
+    first = decode(encode([TOKEN]), intern=table)
+    second = decode(encode([[TOKEN]]), intern=table)
+    assert first[0] is second[0][0]
+    assert len(table) == 1
+    assert table.hits == 1
+
+
+def test_intern_serializable_objects():
+    receipts = [make_receipt(index) for index in range(10)]
+    encodings = [encode(receipt) for receipt in receipts]
+    table = InternTable()
+    decoded = decode_many(encodings, Receipt, intern=table)
+    assert decoded == decode_many(encodings, Receipt)
+    assert all(receipt.logs[1] is decoded[0].logs[1] for receipt in decoded)
+    assert all(receipt.logs[0].address is decoded[0].logs[0].address for receipt in decoded)
+    assert all(receipt.logs[0].topics[0] is decoded[0].logs[0].topics[0] for receipt in decoded)
+
+    # interned objects carry their encoding
+    assert decoded[5].logs[1]._cached_rlp == encode(receipts[5].logs[1])
+    assert [encode(receipt) for receipt in decoded] == encodings
+
+    # the decoded objects themselves are not interned, only the ones nested inside
+    decoded_again = decode(encodings[3], Receipt, intern=table)
+    assert decoded_again == decoded[3]
+    assert decoded_again is not decoded[3]
+    assert decoded_again.logs[0] is decoded[3].logs[0]
+
+
+def test_intern_table_maximum_length():
+    table = InternTable(max_length=30)
+    long_log = Log(TOKEN, [TRANSFER], b'')
+    short_log = Log(TOKEN, [], b'')
+    rlp_code = encode([[long_log, short_log]] * 2, CountableList(CountableList(Log)))
+    decoded = decode(rlp_code, CountableList(CountableList(Log)), intern=table)
+    assert decoded[0][0] is not decoded[1][0]
+    assert decoded[0][0].address is decoded[1][0].address
+    assert decoded[0][1] is decoded[1][1]
+    table.intern(bytes(31))
+    assert table.get(bytes(31)) is None
+
+
+def test_intern_with_deserialization_arguments():
+    # classes with their own constructor, also when it takes extra deserialization arguments
+    class Tagged(Serializable):
+        fields = Log._meta.fields
+
+        def __init__(self, *args, tag=None, **kwargs):
+            super().__init__(*args, **kwargs)
+
+    rlp_code = encode([Log(TOKEN, [TRANSFER], b''), Log(TOKEN, [TRANSFER], b'')])
+    decoded = decode(rlp_code, CountableList(Tagged), intern=True)
+    assert decoded[0].address is decoded[1].address
+    decoded = decode(encode(Log(TOKEN, [TRANSFER], TRANSFER)), Tagged, intern=True, tag=1)
+    assert decoded.topics[0] is decoded.data
+
+
+def test_intern_bytearray_input():
+    rlp_code = bytearray(encode([TOKEN, TOKEN]))
+    decoded = decode(rlp_code, intern=True)
+    assert decoded == [TOKEN, TOKEN]
+    assert decoded[0] is decoded[1]
+    assert isinstance(decoded[0], bytes)
+
+
+def test_intern_zero_copy_is_rejected():
+    with pytest.raises(ValueError):
+        decode(encode(TOKEN), zero_copy=True, intern=True)
+    with pytest.raises(ValueError):
+        decode_many([encode(TOKEN)], zero_copy=True, intern=InternTable())
+
+
+def test_intern_invalid_input():
+    rlp_code = encode(make_receipt(1))
+    with pytest.raises(DecodingError):
+        decode(rlp_code[:-1], Receipt, intern=True)
+    with pytest.raises(DecodingError):
+        decode(rlp_code + b'\x00', Receipt, intern=True)
+
+
+def test_intern_table_evicts_least_recently_used_entries():
+    table = InternTable(max_size=2, min_length=1)
+    a, b, c = b'a', b'b', b'c'
+    table.intern(a)
+    table.intern(b)
+    assert table.intern(bytes(b'a')) is a
+    table.intern(c)
+    assert len(table) == 2
+    assert table.intern(bytes(b'a')) is a
+    assert table.intern(bytes(b'c')) is c
+    assert table.get(b) is None
+
+    table.clear()
+    assert len(table) == 0
+    with pytest.raises(ValueError):
+        InternTable(max_size=0)
@@ -1,5 +1,5 @@
 import pytest
-from rlp import decode, DecodingError
+from rlp import decode, validate, DecodingError
 
 
 invalid_rlp = (
@@ -22,3 +22,10 @@ def test_invalid_rlp():
     for serial in invalid_rlp:
         with pytest.raises(DecodingError):
             decode(serial)
+
+
+def test_validate_invalid_rlp():
+    for serial in invalid_rlp:
+        assert not validate(serial)
+        with pytest.raises(DecodingError):
+            validate(serial, raise_on_error=True)
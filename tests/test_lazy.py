@@ -64,6 +64,80 @@ def test_list_getitem():
     assert l[:2] == [1, 2]
 
 
+class CountingSedes(object):
+
+    def __init__(self):
+        self.deserialized = []
+
+    def deserialize(self, serial):
+        self.deserialized.append(serial)
+        return big_endian_int.deserialize(serial)
+
+
+def test_list_access_decodes_only_touched_elements():
+    sedes = CountingSedes()
+    lazy = rlp.decode_lazy(rlp.encode(list(range(1, 101))), sedes)
+    assert len(lazy) == 100
+    assert sedes.deserialized == []
+    assert lazy[-1] == 100
+    assert lazy[::25] == [1, 26, 51, 76]
+    assert lazy[97:] == [98, 99, 100]
+    assert lazy[-3::-40] == [98, 58, 18]
+    assert lazy[5:2] == []
+    assert lazy[98:1000] == [99, 100]
+    assert len(sedes.deserialized) == 9
+    with pytest.raises(IndexError):
+        lazy[100]
+    with pytest.raises(IndexError):
+        lazy[-101]
+
+    # only the elements up to an index are scanned
+    lazy = rlp.decode_lazy(rlp.encode(list(range(1, 101))), sedes)
+    assert lazy[3] == 4
+    assert lazy[:5] == [1, 2, 3, 4, 5]
+    assert lazy._len is None
+    assert list(lazy) == list(range(1, 101))
+
+
+def test_list_without_kept_elements():
+    sedes = CountingSedes()
+    lazy = rlp.decode_lazy(rlp.encode(list(range(1, 101))), sedes, cache_size=0)
+    assert list(lazy) == list(range(1, 101))
+    assert lazy[-1] == 100
+    assert len(lazy._elements) == 0
+    assert len(sedes.deserialized) == 101
+
+
+def test_list_with_bounded_element_cache():
+    sedes = CountingSedes()
+    lazy = rlp.decode_lazy(rlp.encode(list(range(1, 101))), sedes, cache_size=2)
+    assert lazy[0] == 1
+    assert lazy[1] == 2
+    assert lazy[0] == 1
+    assert lazy[2] == 3  # evicts the least recently used element 2
+    assert list(lazy._elements) == [0, 2]
+    assert lazy[0] == 1
+    assert lazy[1] == 2
+    assert len(sedes.deserialized) == 4
+    assert evaluate(lazy) == tuple(range(1, 101))
+    assert len(lazy._elements) == 2
+
+
+def test_nested_lists_inherit_cache_size():
+    lazy = rlp.decode_lazy(rlp.encode([[b'a', b'b'], [b'c']]), cache_size=1)
+    assert lazy[0].cache_size == 1
+    assert evaluate(lazy) == ((b'a', b'b'), (b'c',))
+    assert rlp.lazy.LazyList(b'\xc2\x01\x02', 1, 3, cache_size=0)[::-1] == [b'\x02', b'\x01']
+
+
+def test_list_element_exceeding_list():
+    # the string in the nested list extends beyond the end of the list
+    lazy = rlp.decode_lazy(b'\xc5\xc2\x83ab\x80')
+    assert lazy[1:] == [b'b', b'']
+    with pytest.raises(rlp.DecodingError):
+        lazy[0][0]
+
+
 def test_nested_list():
     l = ((), (b'a'), (b'b', b'c', b'd'))
 
@@ -0,0 +1,180 @@
+import asyncio
+import io
+
+import pytest
+
+from rlp import (
+    DecodeLimits,
+    Decoder,
+    DecodingError,
+    decode,
+    decode_lazy,
+    decode_many,
+    decode_sequence,
+    encode,
+    iter_decode,
+)
+from rlp.aio import read_item
+from rlp.sedes import CountableList, List, big_endian_int, binary
+
+
+OBJ = [b'cat', [b'dog', [b'x' * 60]], [], b'\x01']
+RLP = encode(OBJ)
+
+
+def decode_lazily(rlp, limits):
+    def materialize(item):
+        if isinstance(item, bytes):
+            return item
+        return [materialize(element) for element in item]
+    return materialize(decode_lazy(rlp, limits=limits))
+
+
+def decode_from_stream(rlp, limits):
+    items = list(iter_decode(io.BytesIO(rlp), limits=limits))
+    assert len(items) == 1
+    return items[0]
+
+
+def decode_from_reader(rlp, limits):
+    loop = asyncio.get_event_loop()
+    reader = asyncio.StreamReader(loop=loop)
+    reader.feed_data(rlp)
+    reader.feed_eof()
+    return loop.run_until_complete(read_item(reader, limits=limits))
+
+
+DECODERS = (
+    lambda rlp, limits: decode(rlp, limits=limits),
+    lambda rlp, limits: decode(rlp, limits=limits, recursive_cache=True),
+    lambda rlp, limits: decode_many([rlp], limits=limits)[0],
+    lambda rlp, limits: decode_sequence(rlp, limits=limits)[0],
+    lambda rlp, limits: Decoder(limits=limits).decode(rlp),
+    decode_lazily,
+    decode_from_stream,
+    decode_from_reader,
+)
+
+
+@pytest.mark.parametrize('decoder', DECODERS)
+@pytest.mark.parametrize('name, value', (
+    ('max_size', len(RLP)),
+    ('max_items', 8),
+    ('max_string_length', 60),
+    ('max_list_length', 4),
+    ('max_depth', 3),
+    ('max_time', 60),
+))
+def test_limits(decoder, name, value):
+    assert decoder(RLP, DecodeLimits(**{name: value})) == OBJ
+    with pytest.raises(DecodingError):
+        decoder(RLP, DecodeLimits(**{name: value - 1 if name != 'max_time' else -1}))
+
+
+@pytest.mark.parametrize('decoder', DECODERS)
+def test_limits_on_root_string(decoder):
+    rlp = encode(b'x' * 100)
+    assert decoder(rlp, DecodeLimits(max_string_length=100, max_depth=0)) == b'x' * 100
+    with pytest.raises(DecodingError):
+        decoder(rlp, DecodeLimits(max_string_length=99))
+
+
+def test_limits_apply_to_each_object():
+    limits = DecodeLimits(max_items=8, max_size=len(RLP))
+    assert decode_many([RLP] * 3, limits=limits) == [OBJ] * 3
+    assert decode_sequence(RLP * 3, limits=limits) == [OBJ] * 3
+    decoder = Decoder(limits=limits)
+    assert [decoder.decode(RLP) for _ in range(3)] == [OBJ] * 3
+
+
+def test_limits_fail_before_reading_payload():
+    stream = io.BytesIO(encode(b'x' * 1000) + encode(b'rest'))
+    with pytest.raises(DecodingError):
+        next(iter_decode(stream, limits=DecodeLimits(max_size=100)))
+    assert stream.tell() == 3
+
+
+def test_limits_fail_early_on_long_lists():
+    rlp = encode(list(range(10000)))
+    with pytest.raises(DecodingError, match='more than the maximum of 100 elements'):
+        decode(rlp, CountableList(binary, max_length=100),
+               limits=DecodeLimits(max_list_length=100))
+
+    lazy = decode_lazy(rlp, limits=DecodeLimits(max_list_length=100))
+    assert lazy[99] == b'c'
+    with pytest.raises(DecodingError):
+        lazy[100]
+
+
+def test_lazy_elements_decoded_again_count_once():
+    rlp = encode([list(range(1, 4)) for _ in range(10)])
+    lazy = decode_lazy(rlp, limits=DecodeLimits(max_items=41), cache_size=0)
+    for _ in range(10):
+        assert [list(element) for element in lazy] == [[b'\x01', b'\x02', b'\x03']] * 10
+
+    lazy = decode_lazy(rlp, limits=DecodeLimits(max_items=40), cache_size=0)
+    with pytest.raises(DecodingError, match='more than the maximum of 40 items'):
+        [list(element) for element in lazy]
+
+
+SEDES = List([binary, List([binary, List([binary])]), List([]), big_endian_int])
+
+SEDES_DECODERS = (
+    lambda rlp, limits: decode(rlp, SEDES, limits=limits),
+    lambda rlp, limits: decode(rlp, SEDES, limits=limits, intern=True),
+    lambda rlp, limits: decode_many([rlp], SEDES, limits=limits)[0],
+    lambda rlp, limits: decode_sequence(rlp, SEDES, limits=limits)[0],
+    lambda rlp, limits: Decoder(limits=limits).decode(rlp, SEDES),
+)
+
+
+@pytest.mark.parametrize('decoder', SEDES_DECODERS)
+@pytest.mark.parametrize('name, value', (
+    ('max_size', len(RLP)),
+    ('max_items', 8),
+    ('max_string_length', 60),
+    ('max_list_length', 4),
+    ('max_depth', 3),
+    ('max_time', 60),
+))
+def test_limits_with_sedes(decoder, name, value):
+    # limits are checked while deserializing
+    expected = SEDES.deserialize(decode(RLP))
+    assert decoder(RLP, DecodeLimits(**{name: value})) == expected
+    with pytest.raises(DecodingError) as excinfo:
+        decoder(RLP, DecodeLimits(**{name: value - 1 if name != 'max_time' else -1}))
+    if name != 'max_time':
+        with pytest.raises(DecodingError) as expected_excinfo:
+            decode(RLP, limits=DecodeLimits(**{name: value - 1}))
+        assert str(excinfo.value) == str(expected_excinfo.value)
+
+
+@pytest.mark.parametrize('rlp_code, limits', (
+    # the first element can't be deserialized, but the limits are exceeded afterwards
+    (encode([[[b'a'], []], [b'b', [[b'c']]]]), DecodeLimits(max_depth=3)),
+    (encode([[[b'a'], []], [b'b', b'c', b'd']]), DecodeLimits(max_items=6)),
+    # the second element extends beyond the list, whose elements exceed the limit first
+    (b'\xc5\xc1\x80\xc3\xc2\x80\x80', DecodeLimits(max_items=4)),
+))
+def test_limits_with_sedes_take_precedence(rlp_code, limits):
+    sedes = CountableList(List([binary, CountableList(binary)], strict=False))
+    with pytest.raises(DecodingError) as expected:
+        sedes.deserialize(decode(rlp_code, limits=limits))
+    with pytest.raises(DecodingError) as result:
+        decode(rlp_code, sedes, limits=limits)
+    assert str(result.value) == str(expected.value)
+
+
+def test_max_depth_with_sedes():
+    sedes = CountableList(CountableList(binary))
+    rlp = encode([[b'a'], [b'b', b'c']])
+    assert decode(rlp, sedes, max_depth=2) == ((b'a',), (b'b', b'c'))
+    with pytest.raises(DecodingError, match='Maximum nesting depth of 1 exceeded'):
+        decode(rlp, sedes, max_depth=1)
+    with pytest.raises(DecodingError, match='Maximum nesting depth of 1 exceeded'):
+        decode(rlp, sedes, max_depth=3, limits=DecodeLimits(max_depth=1))
+
+
+def test_decode_limits_repr():
+    assert repr(DecodeLimits()) == 'DecodeLimits()'
+    assert repr(DecodeLimits(max_depth=2, max_size=10)) == 'DecodeLimits(max_depth=2, max_size=10)'
@@ -0,0 +1,61 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from rlp import (
+    Serializable,
+    SerializationError,
+    encode,
+    encode_parallel,
+)
+from rlp.exceptions import ListSerializationError
+from rlp.sedes import CountableList, List, big_endian_int, binary
+
+
+class Receipt(Serializable):
+    fields = [
+        ('status', big_endian_int),
+        ('data', binary),
+    ]
+
+
+@pytest.fixture(scope='module')
+def executor():
+    with ProcessPoolExecutor(2) as executor:
+        yield executor
+
+
+@pytest.mark.parametrize(
+    'obj,sedes',
+    (
+        ([], None),
+        ([1], None),
+        (list(range(1000)), None),
+        ([1, b'x', [2]], None),
+        ([Receipt(index, b'x' * (index % 80)) for index in range(1000)], CountableList(Receipt)),
+        ((1, b'x'), List((big_endian_int, binary))),
+    ),
+)
+@pytest.mark.parametrize('chunk_length', (None, 1, 7, 5000))
+def test_encode_parallel(executor, obj, sedes, chunk_length):
+    result = encode_parallel(obj, sedes, executor, chunk_length=chunk_length)
+    assert result == encode(obj, sedes)
+
+
+def test_encode_parallel_own_executor():
+    obj = [Receipt(index, b'') for index in range(100)]
+    assert encode_parallel(obj, max_workers=2) == encode(obj)
+
+
+def test_encode_parallel_errors(executor):
+    sedes = CountableList(big_endian_int)
+    with pytest.raises(ListSerializationError) as exc_info:
+        encode_parallel([1, 2, 3, -1, 5], sedes, executor, chunk_length=2)
+    assert exc_info.value.index == 3
+
+    with pytest.raises(SerializationError):
+        encode_parallel([1, 2], CountableList(big_endian_int, max_length=1), executor)
+    with pytest.raises(SerializationError):
+        encode_parallel(b'abc', sedes, executor)
+    with pytest.raises(TypeError):
+        encode_parallel(1, big_endian_int, executor)
@@ -1,8 +1,14 @@
 from __future__ import unicode_literals
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+
+import rlp
 from rlp import SerializationError, DeserializationError
-from rlp import infer_sedes
+from rlp import encode, infer_sedes
+from rlp.codec import _infer_encoding_sedes
 from rlp.sedes import (
     big_endian_int,
     binary,
@@ -80,3 +86,78 @@ def test_list_sedes():
     for s in (c.serialize(i) for i in invalid):
         with pytest.raises(DeserializationError):
             l2.deserialize(s)
+
+
+@pytest.mark.parametrize(
+    'value',
+    (
+        [],
+        [[]],
+        [1, 2, 3],
+        [[], b'asdf'],
+        [1, 'asdf', True, b'', [1, [2]]],
+        [[1, b'a'], [2, b'b'], [3, b'c']],
+        [[1, b'a'], [2, [b'b']]],
+        list(range(1000)),
+    ),
+)
+def test_encoding_sedes_inference(value):
+    inferred = _infer_encoding_sedes(value)
+    assert encode(value, inferred) == encode(value, infer_sedes(value))
+    assert _infer_encoding_sedes(value) is inferred
+
+
+def test_encoding_sedes_inference_of_homogeneous_sequences():
+    assert _infer_encoding_sedes([1] * 100).element_sedes is big_endian_int
+    nested = _infer_encoding_sedes([[1, b'a'], [2, b'b']])
+    assert isinstance(nested, CountableList)
+    assert nested.element_sedes == List((big_endian_int, binary))
+    assert _infer_encoding_sedes([1, 2]) is _infer_encoding_sedes((3, 4, 5))
+
+
+def test_encoding_sedes_inference_errors():
+    for value in (-1, [1, -1], [None], [[1.5]]):
+        with pytest.raises(TypeError):
+            _infer_encoding_sedes(value)
+
+
+def test_encoding_sedes_inference_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(rlp.codec, 'INFERRED_SEDES_CACHE_SIZE', 2)
+    monkeypatch.setattr(rlp.codec, '_inferred_sedes_cache', OrderedDict())
+    for length in range(1, 5):
+        _infer_encoding_sedes([1] + [b'a'] * length)
+    assert len(rlp.codec._inferred_sedes_cache) == 2
+    # the oldest entries have been evicted
+    assert list(rlp.codec._inferred_sedes_cache) == [
+        (big_endian_int,) + (binary,) * 3,
+        (big_endian_int,) + (binary,) * 4,
+    ]
+
+
+def test_encoding_sedes_inference_skips_caching_large_shapes(monkeypatch):
+    monkeypatch.setattr(rlp.codec, '_inferred_sedes_cache', OrderedDict())
+    limit = rlp.codec.INFERRED_SEDES_MAX_SHAPE_SIZE
+    small = [1, b'a'] * (limit // 4)
+    large = [[1, b'a'] * limit]
+    assert _infer_encoding_sedes(small) is _infer_encoding_sedes(small)
+    assert encode(large, _infer_encoding_sedes(large)) == encode(large, infer_sedes(large))
+    assert len(rlp.codec._inferred_sedes_cache) == 1
+    # homogeneous lists are counted by their element shape only
+    _infer_encoding_sedes([[1, b'a']] * limit * 2)
+    assert len(rlp.codec._inferred_sedes_cache) == 2
+
+
+def test_encoding_sedes_inference_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(rlp.codec, 'INFERRED_SEDES_CACHE_SIZE', 2)
+    monkeypatch.setattr(rlp.codec, '_inferred_sedes_cache', OrderedDict())
+    objs = [[1] + [b'a'] * length for length in range(1, 50)]
+
+    def encode_all():
+        for _ in range(20):
+            for obj in objs:
+                assert rlp.decode(encode(obj)) == [b'\x01'] + [b'a'] * (len(obj) - 1)
+
+    with ThreadPoolExecutor(8) as executor:
+        for future in [executor.submit(encode_all) for _ in range(8)]:
+            future.result()
+    assert len(rlp.codec._inferred_sedes_cache) <= 2
@@ -0,0 +1,159 @@
+import pytest
+
+from rlp import (
+    EncodingError,
+    SerializationError,
+    Serializable,
+    encode,
+    encoded_length,
+    iterencode,
+)
+from rlp.codec import encode_raw
+from rlp.exceptions import ListSerializationError, ObjectSerializationError
+from rlp.sedes import (
+    Binary,
+    CountableList,
+    List,
+    big_endian_int,
+    binary,
+    boolean,
+    raw,
+    text,
+)
+from rlp.segments import (
+    append_raw_segments,
+    append_serialized_segments,
+)
+
+
+class Header(Serializable):
+    fields = [
+        ('number', big_endian_int),
+        ('extra', Binary(max_length=32)),
+    ]
+
+
+class Body(Serializable):
+    fields = [
+        ('header', Header),
+        ('flags', CountableList(boolean)),
+        ('names', List((text, binary))),
+    ]
+
+
+@pytest.mark.parametrize(
+    'obj,sedes',
+    (
+        (0, big_endian_int),
+        (1024, big_endian_int),
+        (b'', binary),
+        (b'\x01', binary),
+        (b'x' * 100, binary),
+        ('', text),
+        ('ßüper' * 20, text),
+        (True, boolean),
+        (False, boolean),
+        ([], CountableList(big_endian_int)),
+        ([1, 2, 3], CountableList(big_endian_int)),
+        ([[1], [], [2, 3]], CountableList(CountableList(big_endian_int))),
+        ((5, b'x'), List((big_endian_int, binary))),
+        ([b'a', [b'b']], raw),
+        (Header(1, b'extra'), Header),
+        (Body(Header(2, b''), [True, False], ['name', b'\x00']), Body),
+        ([Header(3, b''), Header(4, b'\xff' * 32)], CountableList(Header)),
+    ),
+)
+def test_fused_encoding_matches_serialization(obj, sedes):
+    segments = []
+    length = append_serialized_segments(obj, sedes, segments)
+    expected = encode_raw(sedes.serialize(obj))
+    assert b''.join(segments) == expected
+    assert length == len(expected)
+    assert encode(obj, sedes) == expected
+
+
+def test_fused_encoding_without_encode_segments():
+    class Reversed:
+        def serialize(self, obj):
+            return obj[::-1]
+
+        def deserialize(self, serial):
+            return serial[::-1]
+
+    sedes = CountableList(Reversed())
+    assert encode([b'abc', b'de'], sedes) == encode([b'cba', b'ed'])
+
+
+class ReversedHeader(Header):
+
+    @classmethod
+    def serialize(cls, obj):
+        return super().serialize(obj)[::-1]
+
+
+class ReversedCountableList(CountableList):
+
+    def serialize(self, obj):
+        return super().serialize(obj)[::-1]
+
+
+class ReversedList(List):
+
+    def serialize(self, obj):
+        return super().serialize(obj)[::-1]
+
+
+class ReversedText(type(text)):
+
+    def serialize(self, obj):
+        return super().serialize(obj)[::-1]
+
+
+@pytest.mark.parametrize(
+    'obj,sedes',
+    (
+        (ReversedHeader(1, b'extra'), ReversedHeader),
+        ([1, 2, 3], ReversedCountableList(big_endian_int)),
+        ((5, b'x'), ReversedList((big_endian_int, binary))),
+        ('abc', ReversedText()),
+        ([ReversedHeader(1, b'')], CountableList(ReversedHeader)),
+    ),
+)
+def test_fused_encoding_respects_overridden_serialize(obj, sedes):
+    expected = encode_raw(sedes.serialize(obj))
+    assert encode(obj, sedes) == expected
+    assert encoded_length(obj, sedes) == len(expected)
+    assert b''.join(iterencode(obj, sedes, chunk_size=1)) == expected
+
+
+@pytest.mark.parametrize(
+    'obj,sedes,exception_type,index',
+    (
+        (-1, big_endian_int, SerializationError, None),
+        ([1, -1], CountableList(big_endian_int), ListSerializationError, 1),
+        ([1], CountableList(big_endian_int, max_length=0), ListSerializationError, None),
+        ((1, b'x', 2), List((big_endian_int, binary)), ListSerializationError, None),
+        ((1, 2), List((big_endian_int, binary)), ListSerializationError, 1),
+        (Header(1, b'x' * 33), Header, ObjectSerializationError, None),
+    ),
+)
+def test_fused_encoding_errors(obj, sedes, exception_type, index):
+    with pytest.raises(exception_type) as serialize_info:
+        sedes.serialize(obj)
+    with pytest.raises(exception_type) as encode_info:
+        encode(obj, sedes)
+    assert str(encode_info.value) == str(serialize_info.value)
+    if index is not None:
+        assert encode_info.value.index == index
+
+
+def test_raw_segments_reference_payloads():
+    payload = b'x' * 100
+    segments = []
+    append_raw_segments([payload, [payload]], segments)
+    assert sum(segment is payload for segment in segments) == 2
+
+
+def test_raw_segments_invalid_item():
+    with pytest.raises(EncodingError):
+        append_raw_segments([b'a', 1], [])
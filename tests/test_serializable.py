@@ -4,10 +4,10 @@ import re
 
 import pytest
 
-from rlp import SerializationError
-from rlp import infer_sedes, encode, decode
-from rlp.sedes import big_endian_int, binary, List
-from rlp.sedes.serializable import Serializable
+from rlp import DecodingError, DeserializationError, SerializationError
+from rlp import infer_sedes, encode, encoded_length, decode, decode_many, decode_sequence
+from rlp.sedes import big_endian_int, binary, raw, CountableList, List
+from rlp.sedes.serializable import BaseSerializable, Serializable
 
 
 class RLPType1(Serializable):
@@ -293,6 +293,49 @@ def test_serializable_encoding_rlp_caching(rlp_obj):
     assert obj_decoded._cached_rlp == rlp_code
 
 
+def test_serializable_encoding_splices_nested_rlp_cache(type_1_a, type_1_b):
+    parent = RLPType2(type_1_a, [type_1_a, type_1_b])
+    expected = encode(parent, cache=False)
+
+    # populate the caches of the children
+    encode(type_1_a)
+    encode(type_1_b)
+    assert encode(parent, cache=False) == expected
+
+    # cached values are spliced in verbatim
+    type_1_b._cached_rlp = b'\xc0'
+    spliced = encode(parent, cache=False)
+    assert spliced != expected
+    assert decode(spliced)[1][1] == []
+    assert encoded_length(parent) == len(spliced)
+
+
+def test_serializable_encoding_ignores_nested_cache_of_other_class(type_1_a):
+    type_4 = RLPType4(1, 2, 3)
+    type_4._cached_rlp = b'\xc0'
+    assert encode([type_4], List((RLPType3,))) == encode([[2, 1, 3]])
+
+
+def test_serializable_encoded_length_uses_cache(rlp_obj):
+    assert encoded_length(rlp_obj) == len(encode(rlp_obj, cache=False))
+
+    rlp_obj._cached_rlp = b'test-uses-cache'
+    assert encoded_length(rlp_obj) == len(b'test-uses-cache')
+
+
+def test_serializable_encoded_length_with_field_named_like_method():
+    class Sized(Serializable):
+        fields = [
+            ('encoded_length', big_endian_int),
+            ('encode_segments', binary),
+        ]
+
+    obj = Sized(1000, b'a' * 100)
+    assert obj.encoded_length == 1000
+    assert encoded_length(obj) == len(encode(obj)) == len(encode([1000, b'a' * 100]))
+    assert encoded_length([obj], List((Sized,))) == len(encode([obj]))
+
+
 def test_list_of_serializable_decoding_rlp_caching(rlp_obj):
     rlp_obj_code = encode(rlp_obj, cache=False)
     L = [rlp_obj, rlp_obj]
@@ -303,6 +346,61 @@ def test_list_of_serializable_decoding_rlp_caching(rlp_obj):
     assert L2[1]._cached_rlp == rlp_obj_code
 
 
+def test_nested_serializable_decoding_rlp_caching(type_2):
+    code = encode(type_2, cache=False)
+
+    decoded = decode(code, sedes=RLPType2)
+    assert decoded._cached_rlp == code
+    assert decoded.field2_1._cached_rlp is None
+    assert all(obj._cached_rlp is None for obj in decoded.field2_2)
+
+    decoded = decode(code, sedes=RLPType2, recursive_cache=True)
+    assert decoded._cached_rlp == code
+    assert decoded.field2_1._cached_rlp == encode(type_2.field2_1, cache=False)
+    assert [obj._cached_rlp for obj in decoded.field2_2] == [
+        encode(obj, cache=False) for obj in type_2.field2_2
+    ]
+
+
+def test_nested_serializable_rlp_caches_refer_to_decoded_bytes(type_2):
+    code = encode(type_2, cache=False)
+    decoded = decode(code, sedes=RLPType2, recursive_cache=True)
+    nested = decoded.field2_2[1]
+    assert nested._rlp_cache[0] is code
+    assert bytes(nested._cached_rlp_view()) == encode(type_2.field2_2[1], cache=False)
+
+    # splicing the cached encodings in doesn't copy them
+    segments = []
+    RLPType2.encode_segments(RLPType2(*decoded), segments)
+    assert any(isinstance(segment, memoryview) for segment in segments)
+    assert b''.join(segments) == code
+    assert nested._rlp_cache[0] is code
+
+    # the encoding is copied out of the buffer once it's accessed, or the object is pickled
+    assert pickle.loads(pickle.dumps(nested))._rlp_cache == nested._cached_rlp
+    assert nested._rlp_cache == encode(type_2.field2_2[1], cache=False)
+
+
+def test_serializable_roots_refer_to_decoded_bytes(type_2, monkeypatch):
+    code = encode(type_2, cache=False)
+    sequence = code * 3
+    offsets = [0, len(code), 2 * len(code), 3 * len(code)]
+    # the caches aren't accessed (and thereby copied out of the buffer) while decoding
+    cache = BaseSerializable._cached_rlp
+    accessed = []
+    monkeypatch.setattr(BaseSerializable, '_cached_rlp', property(
+        lambda obj: accessed.append(obj) or cache.fget(obj), cache.fset,
+    ))
+    for decoded in (
+        decode_sequence(sequence, RLPType2, recursive_cache=True),
+        decode_many(sequence, RLPType2, offsets=offsets, recursive_cache=True),
+        decode_many(sequence, RLPType2, offsets=offsets),
+    ):
+        assert [obj._rlp_cache[0] for obj in decoded] == [sequence] * 3
+        assert all(obj._rlp_cache[0] is sequence for obj in decoded)
+    assert accessed == []
+
+
 def test_serializable_basic_copy(type_1_a):
     n_type_1_a = type_1_a.copy()
     assert n_type_1_a == type_1_a
@@ -617,3 +715,178 @@ def test_serializable_inheritance_from_base_with_no_fields():
 
     class FurtherExtendedSerializable(ExtendedSerializable):
         pass
+
+
+class RLPType5(Serializable):
+    fields = [
+        ('field1', big_endian_int),
+        ('field2', raw),
+        ('field3', CountableList(RLPType1)),
+        ('field4', List((binary,), strict=False)),
+    ]
+
+
+class RLPType6(RLPType1):
+
+    @classmethod
+    def deserialize(cls, serial, **extra_kwargs):
+        obj = super().deserialize(serial, **extra_kwargs)
+        return obj.copy(field2=b'replaced')
+
+
+@pytest.mark.parametrize(
+    'sedes,obj',
+    (
+        (RLPType1, _type_1_a),
+        (RLPType2, _type_2),
+        (RLPType3, RLPType3(1, 2, 3)),
+        (RLPType5, RLPType5(1, [b'raw', [b'']], [_type_1_a, _type_1_b], [b'x'])),
+        (RLPType6, RLPType6(1, b'a', (2, b'b'))),
+        (CountableList(RLPType2), [_type_2, _type_2]),
+    ),
+)
+@pytest.mark.parametrize('recursive_cache', (False, True))
+def test_serializable_decode_equals_deserialize(sedes, obj, recursive_cache):
+    rlp_code = encode(obj, sedes)
+    expected = sedes.deserialize(decode(rlp_code))
+    result = decode(rlp_code, sedes, recursive_cache=recursive_cache)
+    assert result == expected
+    assert type(result) is type(expected)
+    if isinstance(result, Serializable):
+        assert result._cached_rlp == rlp_code
+        nested = result[0] if isinstance(result, RLPType2) else None
+        if nested is not None:
+            assert nested._cached_rlp == (encode(nested) if recursive_cache else None)
+
+
+def test_serializable_decode_ignores_excess_elements_of_non_strict_lists():
+    rlp_code = encode([1, b'', [], [b'x', b'y', [b'z']]])
+    result = decode(rlp_code, RLPType5)
+    assert result.field4 == (b'x',)
+    with pytest.raises(DecodingError):
+        decode(rlp_code[:-1], RLPType5)
+
+
+@pytest.mark.parametrize(
+    'rlp_code',
+    (
+        encode([1, b'a', [0, b'']])[:-1],
+        encode([1, b'a', [0, b'']]) + b'\x00',
+        encode([1, b'a', [0, b'', b'']]),
+        encode([1, b'a', [0]]),
+        encode([1, b'a', b'']),
+        encode([[1], b'a', [0, b'']]),
+        encode([b'\x00\x01', b'a', [0, b'']]),
+        b'\xc6\x01\x61\xc2\x80\x80',
+        # the encoding is invalid after the field that can't be deserialized
+        encode([[1], b'a', [0, b'']])[:-1],
+        encode([[1], b'a', [0, b'']]) + b'\x00',
+        # the number of fields is checked before any field is deserialized
+        b'\xc6\xc1\x01\x83abc',
+        encode([[1], b'a', [0, b''], b'']),
+    ),
+)
+def test_serializable_decode_errors_match_deserialize(rlp_code):
+    with pytest.raises(Exception) as expected:
+        RLPType1.deserialize(decode(rlp_code))
+    with pytest.raises(Exception) as result:
+        decode(rlp_code, RLPType1)
+    assert type(result.value) is type(expected.value)
+    assert str(result.value) == str(expected.value)
+
+
+@pytest.mark.parametrize(
+    'rlp_code, sedes',
+    (
+        (encode([[1, b'a', [0, b'']], [[1, b'a', [0, b'']], [1, b'a', [b'\x00', b'']]]]), RLPType2),
+        (encode([[1, b'a', [0, b'']], [[1, b'a', [0, b'']]]]), RLPType2),
+        (encode([[1, b'a', [0, b'']], b'']), RLPType2),
+        (encode([b'a', b'b', b'c']), CountableList(binary, max_length=2)),
+        (encode([b'a', [b'b'], b'c']), CountableList(binary)),
+        (encode([b'a', [b'b']]), List((binary, binary))),
+        (encode([b'a', [b'b'], b'c']), List((binary, binary))),
+        (b'\xc4\xc1\xc0\xc0\x80', List([big_endian_int, binary])),
+        (encode([[b'a'], b'b']), List([big_endian_int, binary, binary])),
+    ),
+)
+def test_nested_decode_errors_match_deserialize(rlp_code, sedes):
+    with pytest.raises(Exception) as expected:
+        sedes.deserialize(decode(rlp_code))
+    with pytest.raises(Exception) as result:
+        decode(rlp_code, sedes)
+    assert type(result.value) is type(expected.value)
+    assert str(result.value) == str(expected.value)
+    assert result.value.serial == expected.value.serial
+
+
+@pytest.mark.parametrize(
+    'rlp_code',
+    (
+        # invalid headers following an element that is too short
+        b'\xc8\xc5\xb3\x80\xc2\x80\x80\xc0\xf8',
+        # an element extending beyond the list
+        b'\xce\xc5\x01\x78\xc2\x87\x79\x19\xc5\x80\x80\xc2\x80\x80\xfc',
+    ),
+)
+def test_nested_decode_decoding_errors_match_decode(rlp_code):
+    sedes = List([List([big_endian_int, binary, binary]), CountableList(binary), big_endian_int])
+    with pytest.raises(DecodingError) as expected:
+        decode(rlp_code)
+    with pytest.raises(DecodingError) as result:
+        decode(rlp_code, sedes)
+    assert str(result.value) == str(expected.value)
+
+
+def test_serializable_decode_ignores_elements_beyond_list():
+    calls = []
+
+    class Counted(RLPType1):
+        def __init__(self, *args, **kwargs):
+            calls.append(args or kwargs)
+            super().__init__(*args, **kwargs)
+
+    obj_rlp = encode(RLPType1(1, b'a', (0, b'')))
+    # the list announces a single byte, but its element and the bytes following it are valid
+    nested_rlp = b'\xc1' + obj_rlp
+    rlp_code = bytes([0xc0 + len(nested_rlp)]) + nested_rlp
+    for sedes in (CountableList(Counted), List([Counted], strict=False)):
+        with pytest.raises(DecodingError) as result:
+            decode(rlp_code, CountableList(sedes))
+        assert str(result.value) == 'List length prefix announced a too small length'
+    assert calls == []
+
+
+def test_serializable_decode_errors_construct_objects_once():
+    calls = []
+
+    class Counted(RLPType1):
+        def __init__(self, *args, **kwargs):
+            calls.append(args or kwargs)
+            super().__init__(*args, **kwargs)
+
+    class Outer(Serializable):
+        fields = [
+            ('objs', CountableList(Counted)),
+            ('field', big_endian_int),
+        ]
+
+    rlp_code = encode([[[1, b'a', [0, b'']], [2, b'b', [0, b'']]], b'\x00'])
+    with pytest.raises(DeserializationError):
+        decode(rlp_code, Outer)
+    assert len(calls) == 2
+    # the truncated field is found while counting the fields, before any object is constructed
+    with pytest.raises(DecodingError):
+        decode(rlp_code[:-1], Outer)
+    assert len(calls) == 2
+
+
+class RLPType2List(CountableList):
+    pass
+
+
+def test_serializable_recursive_cache_of_custom_sedes():
+    # sedes which aren't deserialized while decoding get their caches from the parse offsets
+    sedes = RLPType2List(RLPType6)
+    objs = [RLPType6(index, b'a', (index, b'b' * index)) for index in range(100)]
+    result = decode(encode(objs, sedes), sedes, recursive_cache=True)
+    assert [obj._cached_rlp for obj in result] == [encode(obj) for obj in objs]
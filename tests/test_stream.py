@@ -0,0 +1,293 @@
+import io
+import itertools
+import socket
+import threading
+
+import pytest
+
+from rlp import (
+    DecodingError,
+    EncodingError,
+    ListWriter,
+    Serializable,
+    SerializationError,
+    encode,
+    encode_to_stream,
+    iter_decode,
+    iterencode,
+)
+from rlp.exceptions import ListSerializationError
+from rlp.sedes import CountableList, List, big_endian_int, binary
+from rlp.sedes import raw
+
+
+class Account(Serializable):
+    fields = [
+        ('nonce', big_endian_int),
+        ('code', binary),
+    ]
+
+
+class Accounts:
+    """A re-iterable collection of accounts without a known length."""
+
+    def __init__(self, count):
+        self.count = count
+        self.iterations = 0
+
+    def __iter__(self):
+        self.iterations += 1
+        for index in range(self.count):
+            yield Account(index, b'\x01' * (index % 100))
+
+
+@pytest.mark.parametrize(
+    'obj,sedes',
+    (
+        (b'', None),
+        (b'a' * 100, None),
+        (1024, None),
+        ([], None),
+        (list(range(10000)), None),
+        ([[1, 2], [3]] * 500, None),
+        ([1, b'x', [2, [3]]], None),
+        ([[b'x' * 300] * 20] * 20, CountableList(CountableList(binary))),
+        ((1, b'a'), List((big_endian_int, binary))),
+        ([Account(1, b'code')] * 300, CountableList(Account)),
+        (Account(1, b'code'), None),
+    ),
+)
+@pytest.mark.parametrize('chunk_size', (1, 100, 65536))
+def test_iterencode(obj, sedes, chunk_size):
+    chunks = list(iterencode(obj, sedes, chunk_size=chunk_size))
+    assert b''.join(chunks) == encode(obj, sedes)
+    assert all(len(chunk) > 0 for chunk in chunks)
+    assert all(len(chunk) >= chunk_size for chunk in chunks[:-1])
+
+
+def test_iterencode_bounded_chunks():
+    obj = [b'x' * 10] * 10000
+    chunks = list(iterencode(obj, chunk_size=1000))
+    assert max(len(chunk) for chunk in chunks) < 1000 + 11
+    assert b''.join(chunks) == encode(obj)
+
+
+def test_iterencode_reiterable():
+    accounts = Accounts(1000)
+    sedes = CountableList(Account)
+    expected = encode(list(accounts), sedes)
+    accounts.iterations = 0
+    assert b''.join(iterencode(accounts, sedes, chunk_size=100)) == expected
+    assert accounts.iterations == 2
+
+
+def test_iterencode_one_shot_iterator():
+    with pytest.raises(TypeError):
+        list(iterencode(iter(Accounts(10)), CountableList(Account)))
+
+
+def test_iterencode_vectors():
+    account = Account(1, b'x' * 100)
+    encode(account)
+    obj = [account] * 3000
+    chunks = list(iterencode(obj, CountableList(Account), chunk_size=1000, vectors=True))
+    assert b''.join(b''.join(chunk) for chunk in chunks) == encode(obj, CountableList(Account))
+    # cached encodings are referenced, not copied
+    assert sum(segment is account._cached_rlp for chunk in chunks for segment in chunk) == 3000
+
+
+def test_iterencode_vector_length_is_limited():
+    chunks = list(iterencode([b'\x01'] * 5000, vectors=True))
+    assert max(len(chunk) for chunk in chunks) <= 1024
+
+
+def test_iterencode_errors():
+    with pytest.raises(ListSerializationError) as exc_info:
+        list(iterencode([1, 2, -1], CountableList(big_endian_int)))
+    assert exc_info.value.index == 2
+    with pytest.raises(SerializationError):
+        list(iterencode(Accounts(10), CountableList(Account, max_length=5)))
+    with pytest.raises(SerializationError):
+        list(iterencode(b'abc', CountableList(binary)))
+    with pytest.raises(SerializationError):
+        list(iterencode([b'a', 5], raw))
+
+
+def test_encode_to_stream():
+    obj = [Account(index, b'x' * index) for index in range(200)]
+    stream = io.BytesIO()
+    assert encode_to_stream(obj, stream, CountableList(Account)) == len(encode(obj))
+    assert stream.getvalue() == encode(obj)
+
+
+@pytest.mark.parametrize('count', (0, 1, 10, 1000))
+@pytest.mark.parametrize('max_payload_length', (None, 0, 100, 2**20))
+def test_list_writer(count, max_payload_length):
+    elements = [b'x' * (index % 70) for index in range(count)]
+    stream = io.BytesIO()
+    stream.write(b'header')
+    with ListWriter(stream, binary, max_payload_length=max_payload_length) as writer:
+        for element in elements:
+            writer.append(element)
+    stream.write(b'trailer')
+    assert stream.getvalue() == b'header' + encode(elements) + b'trailer'
+
+
+def test_list_writer_on_file(tmpdir):
+    path = str(tmpdir.join('export.rlp'))
+    accounts = [Account(index, b'\x01' * (index % 100)) for index in range(5000)]
+    with open(path, 'w+b') as export_file:
+        with ListWriter(export_file, Account) as writer:
+            writer.extend(accounts[:2500])
+            writer.extend(accounts[2500:])
+    with open(path, 'rb') as export_file:
+        assert export_file.read() == encode(accounts)
+
+
+def test_list_writer_on_write_only_file(tmpdir):
+    path = str(tmpdir.join('export.rlp'))
+    with open(path, 'wb') as export_file:
+        with pytest.raises(ValueError):
+            ListWriter(export_file, binary).open()
+        assert export_file.tell() == 0
+        # a sufficient estimate of the payload length avoids moving the elements
+        with ListWriter(export_file, binary, max_payload_length=1000) as writer:
+            writer.extend([b'a' * 100] * 5)
+    with open(path, 'rb') as export_file:
+        assert export_file.read() == encode([b'a' * 100] * 5)
+
+
+def test_list_writer_on_write_only_file_with_wrong_estimate(tmpdir):
+    path = str(tmpdir.join('export.rlp'))
+    with open(path, 'wb') as export_file:
+        writer = ListWriter(export_file, binary, max_payload_length=50)
+        writer.open()
+        writer.append(b'a' * 40)
+        # the element is rejected before it is written
+        with pytest.raises(EncodingError):
+            writer.append(b'a' * 40)
+        assert export_file.tell() == 42
+        writer.append(b'a' * 5)
+        assert writer.close() == 48
+
+        with ListWriter(export_file, max_payload_length=0) as writer:
+            with writer.list(max_payload_length=0) as nested:
+                nested.append(b'a' * 52)
+            with pytest.raises(EncodingError):
+                writer.list(max_payload_length=1000)
+        with pytest.raises(EncodingError):
+            with ListWriter(export_file, binary, max_payload_length=1000) as writer:
+                writer.append(b'a')
+    with open(path, 'rb') as export_file:
+        expected = encode([b'a' * 40, b'a' * 5]) + encode([[b'a' * 52]])
+        assert export_file.read(len(expected)) == expected
+
+
+def test_list_writer_keeps_following_data():
+    stream = io.BytesIO(b'x' * 100 + b'trailer')
+    stream.seek(10)
+    with ListWriter(stream) as writer:
+        writer.append(b'dog')
+    rlp_code = encode([b'dog'])
+    assert stream.tell() == 10 + len(rlp_code)
+    assert stream.getvalue()[:10 + len(rlp_code)] == b'x' * 10 + rlp_code
+    assert stream.getvalue().endswith(b'trailer')
+
+
+def test_nested_list_writer():
+    stream = io.BytesIO()
+    with ListWriter(stream) as writer:
+        writer.append(1)
+        with writer.list() as nested:
+            nested.append(b'a' * 60)
+            with nested.list() as empty:
+                pass
+            with pytest.raises(ValueError):
+                writer.append(2)
+        writer.append([b'b'])
+        assert empty.closed
+    assert stream.getvalue() == encode([1, [b'a' * 60, []], [b'b']])
+
+
+def test_list_writer_state():
+    writer = ListWriter(io.BytesIO())
+    with pytest.raises(ValueError):
+        writer.append(1)
+    writer.open()
+    with pytest.raises(ValueError):
+        writer.open()
+    writer.append(1)
+    assert writer.close() == 2
+    with pytest.raises(ValueError):
+        writer.append(1)
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_list_writer_not_closed_on_error():
+    stream = io.BytesIO()
+    with pytest.raises(SerializationError):
+        with ListWriter(stream, big_endian_int) as writer:
+            writer.append(-1)
+    assert not writer.closed
+
+
+ITEMS = [b'', b'\x00', b'\x7f', b'\x80', b'dog', b'x' * 55, b'x' * 56, b'x' * 1000, [],
+         [b'cat', [b'dog', b'']], [b'y' * 60] * 100]
+
+
+def test_iter_decode():
+    stream = io.BytesIO(b''.join(encode(item) for item in ITEMS))
+    assert list(iter_decode(stream)) == ITEMS
+    assert list(iter_decode(io.BytesIO(b''))) == []
+
+
+def test_iter_decode_reads_only_complete_items():
+    encodings = [encode(item) for item in ITEMS]
+    stream = io.BytesIO(b''.join(encodings))
+    items = iter_decode(stream, buffer_size=7)
+    for item, end in zip(ITEMS, itertools.accumulate(len(rlp) for rlp in encodings)):
+        assert next(items) == item
+        assert stream.tell() == end
+
+
+def test_iter_decode_with_sedes():
+    accounts = [Account(nonce, b'code' * nonce) for nonce in range(20)]
+    stream = io.BytesIO()
+    for account in accounts:
+        encode_to_stream(account, stream)
+    stream.seek(0)
+    decoded = list(iter_decode(stream, Account))
+    assert decoded == accounts
+    assert [account._cached_rlp for account in decoded] == [encode(a) for a in accounts]
+
+
+@pytest.mark.parametrize('rlp', (
+    b'\x83do',
+    b'\xc3\x83dog',
+    b'\xb8',
+    b'\x80\xb9\x01',
+    b'\xc0\xf9\x00\x00',
+    b'\x81\x01',
+))
+def test_iter_decode_invalid(rlp):
+    with pytest.raises(DecodingError):
+        list(iter_decode(io.BytesIO(rlp)))
+
+
+def test_iter_decode_from_socket():
+    encodings = [encode(item) for item in ITEMS]
+    sender, receiver = socket.socketpair()
+
+    def send():
+        with sender:
+            for rlp in encodings:
+                # send in pieces that don't line up with the items
+                for start in range(0, len(rlp), 5):
+                    sender.sendall(rlp[start:start + 5])
+
+    thread = threading.Thread(target=send)
+    thread.start()
+    with receiver:
+        assert list(iter_decode(receiver, buffer_size=16)) == ITEMS
+    thread.join()
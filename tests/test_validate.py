@@ -0,0 +1,96 @@
+from hypothesis import (
+    given,
+    strategies as st,
+)
+import pytest
+
+from rlp import (
+    DecodingError,
+    decode,
+    decode_sequence,
+    encode,
+    validate,
+)
+
+
+def decodes(rlp, **kwargs):
+    try:
+        decode(rlp, **kwargs)
+    except DecodingError:
+        return False
+    else:
+        return True
+
+
+def decodes_sequence(rlp):
+    try:
+        decode_sequence(rlp)
+    except DecodingError:
+        return False
+    else:
+        return True
+
+
+VALID = [
+    b'\x00',
+    b'\x80',
+    b'\x81\x80',
+    b'\x83dog',
+    b'\xb8\x38' + b'x' * 56,
+    b'\xc0',
+    b'\xc8\x83cat\x83dog',
+    encode([b'x' * 100, [[], [b'\x01']] * 30]),
+]
+
+
+@pytest.mark.parametrize('rlp', VALID)
+def test_validate_valid(rlp):
+    assert validate(rlp)
+    assert validate(bytearray(rlp))
+    assert validate(memoryview(rlp))
+    assert validate(rlp, raise_on_error=True)
+    assert validate(rlp * 3, sequence=True)
+    assert validate(rlp + b'\x80', strict=False)
+    assert not validate(rlp + b'\x80')
+    assert not validate(rlp[:-1])
+
+
+@pytest.mark.parametrize('rlp, offset', (
+    (b'\xc3\x81\x01\x80', 1),
+    (b'\xc2\xb8\x00', 1),
+    (b'\xc4\x80\xf8\x01\x80', 2),
+    (b'\xc1\x80\x80', 2),
+))
+def test_validate_reports_offset(rlp, offset):
+    with pytest.raises(DecodingError, match='offset {}'.format(offset)):
+        validate(rlp, raise_on_error=True)
+
+
+def test_validate_sequence():
+    assert validate(b'', sequence=True)
+    assert not validate(b'')
+    assert not validate(b'\x83dog\x83ca', sequence=True)
+
+
+def test_validate_non_buffer():
+    assert not validate('\xc0')
+    with pytest.raises(DecodingError):
+        validate(None, raise_on_error=True)
+
+
+rlp_strategy = st.recursive(
+    st.binary(max_size=70),
+    lambda children: st.lists(children, max_size=5),
+    max_leaves=20,
+).map(encode)
+
+
+@given(rlp=st.one_of(st.binary(max_size=20), rlp_strategy), data=st.data())
+def test_validate_agrees_with_decode(rlp, data):
+    if rlp and data.draw(st.booleans()):
+        # corrupt a single byte
+        position = data.draw(st.integers(0, len(rlp) - 1))
+        rlp = rlp[:position] + bytes([data.draw(st.integers(0, 255))]) + rlp[position + 1:]
+    assert validate(rlp) == decodes(rlp)
+    assert validate(rlp, strict=False) == decodes(rlp, strict=False)
+    assert validate(rlp, sequence=True) == decodes_sequence(rlp)
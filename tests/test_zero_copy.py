@@ -0,0 +1,139 @@
+import mmap
+
+import pytest
+
+from rlp import (
+    DecodingError,
+    Serializable,
+    decode,
+    decode_many,
+    encode,
+    encode_many,
+)
+from rlp.sedes import (
+    CountableList,
+    big_endian_int,
+    binary,
+    boolean,
+    text,
+)
+
+
+class Transaction(Serializable):
+    fields = [
+        ('nonce', big_endian_int),
+        ('to', binary),
+        ('data', binary),
+        ('memo', text),
+        ('flag', boolean),
+    ]
+
+
+TRANSACTIONS = [
+    Transaction(index, b'\x35' * 20, b'\x42' * (index * 30), 'tx {}'.format(index), index % 2 == 0)
+    for index in range(5)
+]
+
+
+def test_zero_copy_returns_views():
+    obj = [b'a', b'dog', [b'x' * 100, b''], b'cat' * 30]
+    rlp = encode(obj)
+    decoded = decode(rlp, zero_copy=True)
+    assert decoded == obj
+    assert all(isinstance(item, memoryview) for item in (decoded[1], decoded[2][0], decoded[3]))
+    assert decoded[2][0].obj is rlp
+    assert decode(rlp) == obj
+
+
+@pytest.mark.parametrize('to_buffer', (bytes, bytearray, memoryview))
+def test_zero_copy_accepts_buffers(to_buffer):
+    rlp = encode([b'dog', [b'cat', 1]])
+    assert decode(to_buffer(rlp), zero_copy=True) == [b'dog', [b'cat', b'\x01']]
+
+
+def test_zero_copy_views_share_memory():
+    rlp = encode([b'dog', b'cat'])
+    with mmap.mmap(-1, len(rlp)) as backing:
+        backing[:] = rlp
+        dog, cat = decode(backing, zero_copy=True)
+        backing[-3:] = b'cow'
+        assert cat == b'cow'
+        if hasattr(memoryview, 'toreadonly'):
+            assert hash(cat) == hash(b'cow')
+        del dog, cat
+
+
+def test_zero_copy_from_bytearray_is_hashable():
+    backing = bytearray(encode(TRANSACTIONS[1]))
+    decoded = decode(backing, Transaction, zero_copy=True)
+    assert isinstance(decoded.to, memoryview)
+    assert decoded == TRANSACTIONS[1]
+    assert hash(decoded) == hash(TRANSACTIONS[1])
+    # the unhashable buffer has been copied
+    backing[-2] ^= 0xff
+    assert decoded == TRANSACTIONS[1]
+
+
+def test_zero_copy_from_mmap(tmpdir):
+    path = str(tmpdir.join('transactions'))
+    with open(path, 'wb') as f:
+        f.write(encode(TRANSACTIONS, CountableList(Transaction)))
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            decoded = decode(m, CountableList(Transaction), zero_copy=True)
+            assert decoded == tuple(TRANSACTIONS)
+            assert isinstance(decoded[3].data, memoryview)
+            assert [tx.memo for tx in decoded] == [tx.memo for tx in TRANSACTIONS]
+            # decoded objects can be encoded again
+            assert encode(decoded, CountableList(Transaction)) == m[:]
+            del decoded
+
+
+def test_zero_copy_deserialization_caches_bytes():
+    rlp = encode(TRANSACTIONS, CountableList(Transaction))
+    decoded = decode(memoryview(rlp), CountableList(Transaction), recursive_cache=True,
+                     zero_copy=True)
+    assert [tx._cached_rlp for tx in decoded] == [encode(tx) for tx in TRANSACTIONS]
+    assert all(type(tx._cached_rlp) is bytes for tx in decoded)
+    assert encode(decoded[2]) == encode(TRANSACTIONS[2], cache=False)
+
+
+def test_zero_copy_root_cache_refers_to_input():
+    rlp = encode(TRANSACTIONS[3])
+    decoded = decode(memoryview(rlp), Transaction, zero_copy=True)
+    buffer, start, end = decoded._rlp_cache
+    assert buffer.obj is rlp
+    assert (start, end) == (0, len(rlp))
+    assert decoded._cached_rlp == rlp
+
+    with mmap.mmap(-1, len(rlp)) as backing:
+        backing[:] = rlp
+        decoded = decode(backing, Transaction, zero_copy=True)
+        if hasattr(memoryview, 'toreadonly'):
+            assert decoded._rlp_cache[0].obj is backing
+        else:
+            assert decoded._rlp_cache is None
+        del decoded
+
+
+def test_decode_many_zero_copy():
+    rlp, offsets = encode_many(TRANSACTIONS, concatenate=True)
+    decoded = decode_many(rlp, Transaction, offsets=offsets, zero_copy=True)
+    assert decoded == TRANSACTIONS
+    assert isinstance(decoded[0].to, memoryview)
+    blobs = [memoryview(encode(tx)) for tx in TRANSACTIONS]
+    assert decode_many(blobs, Transaction, zero_copy=True) == TRANSACTIONS
+
+
+@pytest.mark.parametrize('rlp', ('\xc0', 0, None, [b'\xc0']))
+def test_zero_copy_rejects_non_buffers(rlp):
+    with pytest.raises(DecodingError):
+        decode(rlp, zero_copy=True)
+
+
+def test_zero_copy_rejects_invalid_rlp():
+    with pytest.raises(DecodingError):
+        decode(memoryview(b'\x83do'), zero_copy=True)
+    with pytest.raises(DecodingError):
+        decode(bytearray(b'\xc1\x80\x80'), zero_copy=True)